@@ -0,0 +1,19 @@
+from sqlalchemy import text
+from app.database import engine
+
+
+def main():
+    # New databases get the column from create_all; this upgrades existing ones.
+    # Existing decks keep a null creation time: their forks count at the epoch.
+    if engine.dialect.name != "postgresql":
+        print("Only PostgreSQL databases are upgraded; recreate others.")
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            text("ALTER TABLE decks ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ")
+        )
+    print("Deck created_at column is in place.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from sqlalchemy import text
+from app.database import engine
+
+
+def main():
+    # New databases get the column from create_all; this upgrades existing ones.
+    # Existing decks start with the migration time as their version stamp.
+    if engine.dialect.name != "postgresql":
+        print("Only PostgreSQL databases are upgraded; recreate others.")
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "ALTER TABLE decks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ "
+                "NOT NULL DEFAULT now()"
+            )
+        )
+    print("Deck updated_at column is in place.")
+
+
+if __name__ == "__main__":
+    main()
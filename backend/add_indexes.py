@@ -0,0 +1,52 @@
+from sqlalchemy import Column, inspect, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+from app.database import Base, engine
+from app.models import CARD_TAG_NAMESPACES_DDL, Card
+
+# Indexes replaced by a later definition, dropped once their successor exists
+SUPERSEDED_INDEXES = [
+    "ix_cards_deck_id",  # Leading column of idx_card_deck_next_review
+]
+
+
+def main():
+    # New databases get the indexes from create_all, which skips existing
+    # tables; this adds the ones declared since a table was created. Building
+    # an index locks writes to its table, so run it off-peak on large tables.
+    if engine.dialect.name != "postgresql":
+        print("Only PostgreSQL databases are upgraded; recreate others.")
+        return
+
+    inspector = inspect(engine)
+    rebuilt = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {
+                index["name"]: index["column_names"]
+                for index in inspector.get_indexes(table.name)
+            }
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                # Key columns are only compared for plain column indexes
+                plain = all(isinstance(key, Column) for key in index.expressions)
+                columns = [column.name for column in index.columns]
+                if plain and existing.get(index.name, columns) != columns:
+                    # Same name, new key columns (e.g. a tie-breaker was added)
+                    conn.execute(DropIndex(index))
+                    rebuilt.append(index.name)
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+        # Expression index declared as DDL rather than as an Index
+        for statement in CARD_TAG_NAMESPACES_DDL:
+            conn.execute(statement.against(Card.__table__))
+
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    print(
+        f"Model indexes are in place (rebuilt: {', '.join(rebuilt) or 'none'}); "
+        f"dropped superseded {', '.join(SUPERSEDED_INDEXES)} if present."
+    )
+
+
+if __name__ == "__main__":
+    main()
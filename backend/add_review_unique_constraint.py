@@ -0,0 +1,45 @@
+import sys
+from sqlalchemy import text
+from app.database import engine
+import add_deck_created_at
+import add_deck_updated_at
+import backfill_deck_counters
+
+
+def main():
+    # New databases get the constraint from create_all; this upgrades existing
+    # ones. Duplicate reviews left by the old read-then-write path are removed
+    # first, keeping each user's latest review of a deck.
+    # The counter recompute at the end needs every Deck column: add them, or
+    # stop before touching the reviews.
+    if engine.dialect.name == "postgresql":
+        add_deck_created_at.main()
+        add_deck_updated_at.main()
+    missing = backfill_deck_counters.missing_deck_columns()
+    if missing:
+        sys.exit(
+            f"decks is missing columns {', '.join(missing)}; run the upgrade "
+            "scripts listed in docs/database.md in order first."
+        )
+
+    with engine.begin() as conn:
+        removed = conn.execute(
+            text(
+                "DELETE FROM reviews WHERE id NOT IN ("
+                "SELECT max(id) FROM reviews GROUP BY user_id, deck_id)"
+            )
+        ).rowcount
+        # A unique index is also a valid ON CONFLICT (user_id, deck_id) target
+        conn.execute(
+            text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_review_user_deck "
+                "ON reviews (user_id, deck_id)"
+            )
+        )
+    print(f"Removed {removed} duplicate reviews; unique constraint is in place.")
+    # Ratings of the removed reviews were counted; recompute the deck counters
+    backfill_deck_counters.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+from app.database import engine
+from app.models import CARD_SEARCH_DDL
+
+
+def main():
+    # New databases get the column from create_all; this upgrades existing ones.
+    # Adding a stored generated column rewrites the cards table once.
+    if engine.dialect.name != "postgresql":
+        print("Full-text search column is PostgreSQL only, nothing to do.")
+        return
+    with engine.begin() as conn:
+        for statement in CARD_SEARCH_DDL:
+            conn.execute(statement)
+    print("Card search_vector column and GIN index are in place.")
+
+
+if __name__ == "__main__":
+    main()
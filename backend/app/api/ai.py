@@ -1,15 +1,34 @@
+import asyncio
+import functools
 import json
-import google.generativeai as genai
-from openai import OpenAI
-from groq import Groq
-import anthropic
+from typing import AsyncIterator, Optional
+import google.ai.generativelanguage as glm
 from fastapi import APIRouter, HTTPException, Depends, status
-from ..schemas import AIPromptRequest, AIProjectResponse, AITestRequest
+from fastapi.responses import StreamingResponse
+from ..database import settings
+from ..json_stream import JSONFieldStream
+from ..services import ai_cache, ai_clients, ai_resilience
+from ..schemas import (
+    AIBatchPromptRequest,
+    AIFallback,
+    AIPromptRequest,
+    AIProjectResponse,
+    AITestRequest,
+)
 from .auth import get_current_user
 from .. import models
 
 router = APIRouter()
 
+OPENAI_SYSTEM_PROMPT = "You are a Senior Software Architect. Always return technical flashcards as a valid JSON object. Never include markdown code blocks around the JSON itself if using json_object mode."
+ANTHROPIC_SYSTEM_PROMPT = "You are a helpful assistant that generates coding flashcards in JSON format. Always return ONLY the JSON object."
+GROQ_SYSTEM_PROMPT = "You are a Senior Software Architect. Always return technical flashcards as a valid JSON object. Ensure the 'code_snippet' field is never empty."
+
+
+# Part of the AI response cache key: bump whenever get_gen_prompt changes so
+# cards generated from the old template are no longer served.
+PROMPT_TEMPLATE_VERSION = 1
+
 
 def get_gen_prompt(user_prompt: str) -> str:
     """
@@ -42,34 +61,54 @@ def get_gen_prompt(user_prompt: str) -> str:
     """
 
 
+def _gemini_model(model_name: str) -> str:
+    if model_name.startswith("models/"):
+        return model_name
+    return f"models/{model_name}"
+
+
 async def generate_gemini(prompt: str, api_key: str, model_name: str):
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-        if not response.text:
+        client = ai_clients.get_client("gemini", api_key)
+        response = await ai_resilience.guarded(
+            "gemini",
+            client.generate_content(
+                model=_gemini_model(model_name),
+                contents=[glm.Content(parts=[glm.Part(text=prompt)])],
+                timeout=settings.AI_PROVIDER_TIMEOUT_SECONDS,
+            ),
+        )
+        text = "".join(
+            part.text
+            for candidate in response.candidates[:1]
+            for part in candidate.content.parts
+        )
+        if not text:
             raise ValueError("Empty response from Gemini API")
-        return response.text
+        return text
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Gemini Error: {str(e)}")
 
 
 async def generate_openai(prompt: str, api_key: str, model_name: str):
     try:
-        client = OpenAI(api_key=api_key)
+        client = ai_clients.get_client("openai", api_key)
         # Some models (like vision or older ones) might not support json_object
         response_format = {"type": "json_object"}
 
-        completion = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a Senior Software Architect. Always return technical flashcards as a valid JSON object. Never include markdown code blocks around the JSON itself if using json_object mode.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            response_format=response_format,
+        completion = await ai_resilience.guarded(
+            "openai",
+            client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": OPENAI_SYSTEM_PROMPT,
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                response_format=response_format,
+            ),
         )
         return completion.choices[0].message.content
 
@@ -79,12 +118,15 @@ async def generate_openai(prompt: str, api_key: str, model_name: str):
 
 async def generate_anthropic(prompt: str, api_key: str, model_name: str):
     try:
-        client = anthropic.Anthropic(api_key=api_key)
-        message = client.messages.create(
-            model=model_name,
-            max_tokens=2000,
-            system="You are a helpful assistant that generates coding flashcards in JSON format. Always return ONLY the JSON object.",
-            messages=[{"role": "user", "content": prompt}],
+        client = ai_clients.get_client("anthropic", api_key)
+        message = await ai_resilience.guarded(
+            "anthropic",
+            client.messages.create(
+                model=model_name,
+                max_tokens=2000,
+                system=ANTHROPIC_SYSTEM_PROMPT,
+                messages=[{"role": "user", "content": prompt}],
+            ),
         )
         return message.content[0].text
     except Exception as e:
@@ -93,17 +135,20 @@ async def generate_anthropic(prompt: str, api_key: str, model_name: str):
 
 async def generate_groq(prompt: str, api_key: str, model_name: str):
     try:
-        client = Groq(api_key=api_key)
-        completion = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a Senior Software Architect. Always return technical flashcards as a valid JSON object. Ensure the 'code_snippet' field is never empty.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            response_format={"type": "json_object"},
+        client = ai_clients.get_client("groq", api_key)
+        completion = await ai_resilience.guarded(
+            "groq",
+            client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": GROQ_SYSTEM_PROMPT,
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                response_format={"type": "json_object"},
+            ),
         )
         return completion.choices[0].message.content
 
@@ -111,6 +156,74 @@ async def generate_groq(prompt: str, api_key: str, model_name: str):
         raise HTTPException(status_code=400, detail=f"Groq Error: {str(e)}")
 
 
+async def generate_qwen(prompt: str, api_key: str, model_name: str, json_mode=True):
+    try:
+        client = ai_clients.get_client("qwen", api_key)
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        completion = await ai_resilience.guarded(
+            "qwen",
+            client.chat.completions.create(
+                model=model_name,
+                messages=[{"role": "user", "content": prompt}],
+                **extra,
+            ),
+        )
+        return completion.choices[0].message.content
+
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Qwen Error: {str(e)}")
+
+
+async def stream_card_text(
+    provider: str, prompt: str, api_key: str, model_name: str
+) -> AsyncIterator[str]:
+    """
+    Yields the provider's completion text as it is generated, chunk by chunk.
+    Uses the same models, system prompts and JSON modes as the generate_* helpers.
+    """
+    client = ai_clients.get_client(provider, api_key)
+
+    if provider == "gemini":
+        responses = await client.stream_generate_content(
+            model=_gemini_model(model_name),
+            contents=[glm.Content(parts=[glm.Part(text=prompt)])],
+            timeout=settings.AI_PROVIDER_TIMEOUT_SECONDS,
+        )
+        async for response in responses:
+            for candidate in response.candidates[:1]:
+                for part in candidate.content.parts:
+                    if part.text:
+                        yield part.text
+        return
+
+    if provider == "anthropic":
+        async with client.messages.stream(
+            model=model_name,
+            max_tokens=2000,
+            system=ANTHROPIC_SYSTEM_PROMPT,
+            messages=[{"role": "user", "content": prompt}],
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+        return
+
+    # OpenAI compatible chat completions
+    messages = [{"role": "user", "content": prompt}]
+    if provider == "openai":
+        messages.insert(0, {"role": "system", "content": OPENAI_SYSTEM_PROMPT})
+    elif provider == "groq":
+        messages.insert(0, {"role": "system", "content": GROQ_SYSTEM_PROMPT})
+    chunks = await client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+    async for chunk in chunks:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
 @router.post("/test-connection")
 async def test_connection(
     request: AITestRequest, current_user: models.User = Depends(get_current_user)
@@ -129,13 +242,8 @@ async def test_connection(
         elif request.provider == "groq":
             await generate_groq(test_prompt, request.api_key, request.model)
         elif request.provider == "qwen":
-            # Reuse OpenAI logic for Qwen (OpenAI compatible)
-            client = OpenAI(
-                api_key=request.api_key,
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-            )
-            client.chat.completions.create(
-                model=request.model, messages=[{"role": "user", "content": test_prompt}]
+            await generate_qwen(
+                test_prompt, request.api_key, request.model, json_mode=False
             )
         else:
             raise HTTPException(
@@ -150,6 +258,80 @@ async def test_connection(
         raise HTTPException(status_code=400, detail=f"Connection test failed: {str(e)}")
 
 
+async def generate_text(provider: str, prompt: str, api_key: str, model: str) -> str:
+    if provider == "gemini":
+        return await generate_gemini(prompt, api_key, model)
+    elif provider == "openai":
+        return await generate_openai(prompt, api_key, model)
+    elif provider == "anthropic":
+        return await generate_anthropic(prompt, api_key, model)
+    elif provider == "groq":
+        return await generate_groq(prompt, api_key, model)
+    elif provider == "qwen":
+        return await generate_qwen(prompt, api_key, model)
+    raise HTTPException(status_code=400, detail=f"Unknown provider: {provider}")
+
+
+async def generate_card_data(
+    provider: str,
+    api_key: str,
+    model: str,
+    user_prompt: str,
+    use_cache=False,
+    fallback: Optional[AIFallback] = None,
+) -> dict:
+    """
+    Asks the provider for a flashcard about `user_prompt` and parses the JSON
+    object out of its answer. With `use_cache`, an identical earlier generation
+    is returned from the response cache instead.
+
+    When a `fallback` provider is given, it is also asked if the primary fails
+    or has not answered within its p95 latency (see ai_resilience.hedged).
+    """
+    key = None
+    if use_cache:
+        key = ai_cache.cache_key(PROMPT_TEMPLATE_VERSION, user_prompt, provider, model)
+        cached = await ai_cache.lookup(key)
+        if cached is not None:
+            return cached
+
+    prompt = get_gen_prompt(user_prompt)
+    primary = functools.partial(generate_text, provider, prompt, api_key, model)
+    backup = None
+    if fallback is not None:
+        backup = functools.partial(
+            generate_text, fallback.provider, prompt, fallback.api_key, fallback.model
+        )
+    text = await ai_resilience.hedged(provider, primary, backup)
+
+    data = parse_card_text(text, provider)
+    if key is not None:
+        await ai_cache.store(key, AIProjectResponse.model_validate(data).model_dump())
+    return data
+
+
+def parse_card_text(text: Optional[str], provider: str) -> dict:
+    """Extracts the card JSON object from a completion, with or without fences."""
+    if not text:
+        raise ValueError(f"Empty response from {provider} API")
+
+    # Extract JSON from response text
+    if "```json" in text:
+        json_str = text.split("```json")[1].split("```")[0].strip()
+    elif "```" in text:
+        json_str = text.split("```")[1].split("```")[0].strip()
+    else:
+        json_str = text.strip()
+
+    return json.loads(json_str)
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    return str(error)
+
+
 @router.post("/generate", response_model=AIProjectResponse)
 async def generate_card(
     request: AIPromptRequest, current_user: models.User = Depends(get_current_user)
@@ -157,50 +339,139 @@ async def generate_card(
     """
     Generates a technical flashcard using the user-provided AI credentials.
     """
-    prompt = get_gen_prompt(request.prompt)
-
     try:
-        if request.provider == "gemini":
-            text = await generate_gemini(prompt, request.api_key, request.model)
-        elif request.provider == "openai":
-            text = await generate_openai(prompt, request.api_key, request.model)
-        elif request.provider == "anthropic":
-            text = await generate_anthropic(prompt, request.api_key, request.model)
-        elif request.provider == "groq":
-            text = await generate_groq(prompt, request.api_key, request.model)
-        elif request.provider == "qwen":
-            # Qwen uses OpenAI client
-            client = OpenAI(
-                api_key=request.api_key,
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-            )
-            completion = client.chat.completions.create(
-                model=request.model,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-            )
-            text = completion.choices[0].message.content
-        else:
-            raise HTTPException(
-                status_code=400, detail=f"Unknown provider: {request.provider}"
-            )
-
-        if not text:
-            raise ValueError(f"Empty response from {request.provider} API")
-
-        # Extract JSON from response text
-        if "```json" in text:
-            json_str = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            json_str = text.split("```")[1].split("```")[0].strip()
-        else:
-            json_str = text.strip()
-
-        data = json.loads(json_str)
-        return data
+        return await generate_card_data(
+            request.provider,
+            request.api_key,
+            request.model,
+            request.prompt,
+            use_cache=request.use_cache,
+            fallback=request.fallback,
+        )
     except Exception as e:
         error_msg = str(e)
         raise HTTPException(
             status_code=500,
             detail=f"AI Generation Error ({request.provider}): {error_msg}",
         )
+
+
+@router.post("/generate/batch")
+async def generate_cards_batch(
+    request: AIBatchPromptRequest,
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Generates one flashcard per prompt, at most AI_BATCH_CONCURRENCY at a time.
+
+    Results stream back as NDJSON, one line per prompt in completion order:
+    `{"index", "prompt", "card"}` on success or `{"index", "prompt", "error"}`
+    when that prompt failed. A failed prompt does not stop the others.
+    """
+    semaphore = asyncio.Semaphore(settings.AI_BATCH_CONCURRENCY)
+
+    async def generate_one(index: int, user_prompt: str) -> dict:
+        result = {"index": index, "prompt": user_prompt}
+        async with semaphore:
+            try:
+                data = await generate_card_data(
+                    request.provider,
+                    request.api_key,
+                    request.model,
+                    user_prompt,
+                    use_cache=request.use_cache,
+                    fallback=request.fallback,
+                )
+                result["card"] = AIProjectResponse.model_validate(data).model_dump()
+            except Exception as e:
+                result["error"] = _error_message(e)
+        return result
+
+    async def results():
+        tasks = [
+            asyncio.create_task(generate_one(index, user_prompt))
+            for index, user_prompt in enumerate(request.prompts)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # Client went away: stop paying for generations nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/generate/stream")
+async def generate_card_stream(
+    request: AIPromptRequest, current_user: models.User = Depends(get_current_user)
+):
+    """
+    Streaming variant of /generate, as Server-Sent Events.
+
+    Emits `token` events relaying the provider's output as it arrives, a `field`
+    event as soon as each top-level card field is complete, then a final `card`
+    event with the validated card, or an `error` event.
+    """
+    if request.provider not in ai_clients.PROVIDERS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown provider: {request.provider}"
+        )
+    prompt = get_gen_prompt(request.prompt)
+    deadline = settings.AI_REQUEST_DEADLINE_SECONDS
+
+    key = None
+    if request.use_cache:
+        key = ai_cache.cache_key(
+            PROMPT_TEMPLATE_VERSION, request.prompt, request.provider, request.model
+        )
+
+    async def events():
+        parts = []
+        fields = JSONFieldStream()
+        try:
+            cached = await ai_cache.lookup(key) if key is not None else None
+            if cached is not None:
+                for name, value in cached.items():
+                    yield _sse("field", {"name": name, "value": value})
+                yield _sse("card", cached)
+                return
+
+            async with (
+                ai_resilience.tracked(request.provider),
+                asyncio.timeout(deadline if deadline > 0 else None),
+            ):
+                async for text in stream_card_text(
+                    request.provider, prompt, request.api_key, request.model
+                ):
+                    parts.append(text)
+                    yield _sse("token", {"text": text})
+                    for name, value in fields.feed(text):
+                        yield _sse("field", {"name": name, "value": value})
+
+            data = parse_card_text("".join(parts), request.provider)
+            card = AIProjectResponse.model_validate(data).model_dump()
+            if key is not None:
+                await ai_cache.store(key, card)
+            yield _sse("card", card)
+        except Exception as e:
+            if isinstance(e, TimeoutError):
+                e = TimeoutError(f"No response within {deadline:g}s")
+            yield _sse(
+                "error",
+                {
+                    "detail": f"AI Generation Error ({request.provider}): "
+                    f"{_error_message(e)}"
+                },
+            )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -4,21 +4,47 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.responses import RedirectResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from ..cache import TTLCache
 from ..database import get_db, settings
 from .. import models, schemas
+from ..services import deck_service
 
 router = APIRouter()
 
 security = HTTPBearer(auto_error=False)
 
+# Detached snapshots of authenticated users, keyed by the token subject (email)
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+
+def _detached_user(user: models.User) -> models.User:
+    """Copies the column state of a user into a detached instance safe to cache."""
+    snapshot = models.User(
+        **{
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(models.User).column_attrs
+        }
+    )
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def invalidate_cached_user(email: str):
+    """Drops a user from the authentication cache after their row changes."""
+    user_cache.pop(email)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Generates a JWT access token for a user.
 
     Args:
-        data: Dictionary containing the 'sub' claim (user email).
+        data: Dictionary containing the 'sub' claim (user email) and optionally
+            the 'uid' claim (user id) used for primary-key lookups.
         expires_delta: Optional expiration override.
 
     Returns:
@@ -38,7 +64,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(
+def get_current_user(
     request: Request,
     auth: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db),
@@ -46,6 +72,8 @@ async def get_current_user(
     """
     Dependency used to protect routes. Validates the JWT and returns the current user.
     Checks Authorization header OR access_token cookie.
+    Declared sync so FastAPI runs its database I/O in the threadpool rather than
+    on the event loop.
     """
     token = None
 
@@ -75,9 +103,25 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.email == email).first()
+    if settings.USER_CACHE_TTL_SECONDS > 0:
+        cached = user_cache.get(email)
+        if cached is not None:
+            # Attach the snapshot to this session without emitting a SELECT
+            return db.merge(cached, load=False)
+
+    user_id = payload.get("uid")
+    if isinstance(user_id, int):
+        user = db.get(models.User, user_id)
+        if user is not None and user.email != email:
+            user = None
+    else:
+        # Tokens issued before the uid claim existed
+        user = db.query(models.User).filter(models.User.email == email).first()
     if user is None:
         raise credentials_exception
+
+    if settings.USER_CACHE_TTL_SECONDS > 0:
+        user_cache.set(email, _detached_user(user))
     return user
 
 
@@ -137,14 +181,18 @@ def github_exchange(
         db.refresh(user)
     else:
         # Update existing user info
+        if user.username != request.username:
+            # Public deck responses embed the owner's username
+            deck_service.touch_owner_decks(db, user.id)
         user.github_id = request.github_id
         user.username = request.username
         user.avatar_url = request.avatar_url
         db.commit()
         db.refresh(user)
+        invalidate_cached_user(user.email)
 
     # Generate JWT
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -1,10 +1,14 @@
+from datetime import datetime, timezone
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, select, true, update
 from fastapi_filter import FilterDepends
 from ..database import get_db
 from .. import models, schemas, filters
+from ..services import deck_service, roadmap_service, search_index, search_service
+from ..code_tokens import query_terms
+from ..pagination import MAX_PAGE_SIZE, PageParams, page_params, paginate
 from ..sm2 import calculate_sm2
 from .auth import get_current_user
 
@@ -13,12 +17,14 @@ router = APIRouter()
 
 @router.get("/", response_model=List[schemas.CardResponse])
 def read_user_cards(
+    response: Response,
     card_filter: filters.CardFilter = FilterDepends(filters.CardFilter),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """
-    Fetch all cards owned by the current user across all decks.
+    Fetch the cards owned by the current user across all decks, one page at a time.
     Supports advanced filtering and fuzzy search via query parameters.
     """
     query = (
@@ -28,7 +34,162 @@ def read_user_cards(
     )
 
     query = card_filter.filter(query)
-    return query.all()
+    rank = card_filter.rank_expression(query)
+    return paginate(
+        query,
+        page,
+        response,
+        models.Card.id,
+        sort_column=rank,
+        descending=rank is not None,
+    )
+
+
+@router.get("/due", response_model=List[schemas.CardResponse])
+def read_due_cards(
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    deck_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Fetch the study queue: the user's cards that are due for review, across all
+    decks (or a single deck), most overdue first.
+
+    On PostgreSQL each deck contributes at most `limit` cards through a LATERAL
+    subquery, a bounded range scan of the (deck_id, next_review, id) index, and
+    only those candidates are merged and sorted. The work is O(decks x limit)
+    whatever the size of the backlog of due cards.
+    """
+    now = datetime.now(timezone.utc)
+    decks = select(models.Deck.id).where(models.Deck.owner_id == current_user.id)
+    if deck_id is not None:
+        decks = decks.where(models.Deck.id == deck_id)
+
+    if db.get_bind().dialect.name != "postgresql":
+        # Fallback for SQLite/other dialects in tests
+        due = models.Card
+        query = db.query(models.Card).filter(
+            models.Card.deck_id.in_(decks), models.Card.next_review <= now
+        )
+    else:
+        owned = decks.subquery()
+        per_deck = (
+            select(models.Card)
+            .where(models.Card.deck_id == owned.c.id, models.Card.next_review <= now)
+            .order_by(models.Card.next_review, models.Card.id)
+            .limit(limit)
+            .lateral()
+        )
+        due = aliased(models.Card, per_deck)
+        query = db.query(due).select_from(owned).join(per_deck, true())
+
+    return query.order_by(due.next_review, due.id).limit(limit).all()
+
+
+@router.get("/search", response_model=List[schemas.CardSearchResponse])
+def search_cards(
+    q: str = Query(min_length=1, max_length=200),
+    k: int = Query(search_service.DEFAULT_TOP_K, ge=1, le=search_service.MAX_TOP_K),
+    deck_id: Optional[int] = None,
+    card_filter: filters.CardFilter = FilterDepends(filters.CardFilter),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Relevance-ranked search over the user's cards, returning the top `k` hits.
+    Combines the weighted full-text index with title trigram similarity; the
+    other card filters (language, tags) narrow the candidates.
+    """
+    query = (
+        db.query(models.Card)
+        .join(models.Deck)
+        .filter(models.Deck.owner_id == current_user.id)
+    )
+    if deck_id is not None:
+        query = query.filter(models.Card.deck_id == deck_id)
+    query = card_filter.filter(query)
+
+    return [
+        {**schemas.CardResponse.model_validate(card).model_dump(), "score": score}
+        for card, score in search_service.ranked_search(query, q, k)
+    ]
+
+
+@router.get("/code-search", response_model=List[schemas.CardSearchResponse])
+def code_search_cards(
+    q: str = Query(min_length=1, max_length=200),
+    k: int = Query(search_service.DEFAULT_TOP_K, ge=1, le=search_service.MAX_TOP_K),
+    deck_id: Optional[int] = None,
+    card_filter: filters.CardFilter = FilterDepends(filters.CardFilter),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Symbol search over the user's code snippets (`@app.get`, `__init__`,
+    `Depends(`, `async with`). The `language` filter, when given, also selects
+    how the query is tokenized.
+    """
+    terms = query_terms(q, card_filter.language)
+    query = (
+        db.query(models.Card)
+        .join(models.Deck)
+        .filter(models.Deck.owner_id == current_user.id)
+    )
+    if deck_id is not None:
+        query = query.filter(models.Card.deck_id == deck_id)
+    query = card_filter.filter(query)
+
+    return [
+        {**schemas.CardResponse.model_validate(card).model_dump(), "score": score}
+        for card, score in search_service.code_search(query, terms, k)
+    ]
+
+
+@router.get("/suggest", response_model=List[schemas.CardSearchResponse])
+def suggest_cards(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=search_service.MAX_TOP_K),
+    deck_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Type-ahead suggestions over the user's cards: the last word matches as a
+    prefix and typos within one edit are tolerated. Served from the in-memory
+    search index when SEARCH_INDEX_ENABLED, otherwise by the ranked search.
+    """
+    if not search_index.enabled():
+        query = (
+            db.query(models.Card)
+            .join(models.Deck)
+            .filter(models.Deck.owner_id == current_user.id)
+        )
+        if deck_id is not None:
+            query = query.filter(models.Card.deck_id == deck_id)
+        hits = search_service.ranked_search(query, q, limit)
+    else:
+        scores = dict(
+            search_index.card_index.search(current_user.id, q, limit, deck_id=deck_id)
+        )
+        # The database stays the source of truth for contents and ownership
+        cards = (
+            db.query(models.Card)
+            .join(models.Deck)
+            .filter(
+                models.Card.id.in_(scores), models.Deck.owner_id == current_user.id
+            )
+            .all()
+        )
+        hits = sorted(
+            ((card, scores[card.id]) for card in cards),
+            key=lambda hit: (-hit[1], hit[0].id),
+        )
+
+    return [
+        {**schemas.CardResponse.model_validate(card).model_dump(), "score": score}
+        for card, score in hits
+    ]
 
 
 @router.post("/", response_model=schemas.CardResponse)
@@ -48,11 +209,93 @@ def create_card(
 
     db_card = models.Card(**card.model_dump())
     db.add(db_card)
+    db.flush()
+    roadmap_service.apply_card_changes(
+        db, current_user.id, [(None, (db_card.tags, db_card.interval))]
+    )
+    deck_service.touch_decks(db, [db_card.deck_id])
     db.commit()
     db.refresh(db_card)
+    search_index.index_card(db_card, current_user.id)
     return db_card
 
 
+@router.post("/reviews/batch", response_model=List[schemas.CardScheduleResponse])
+def review_cards_batch(
+    batch: schemas.CardReviewBatch,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Apply a whole study session of SM-2 ratings in one transaction.
+    Ownership of every card is checked by a single query and all schedule changes
+    are written by one bulk UPDATE. Several ratings for the same card are applied
+    in `reviewed_at` order.
+    """
+    card_ids = {review.card_id for review in batch.reviews}
+    rows = db.execute(
+        select(
+            models.Card.id,
+            models.Card.deck_id,
+            models.Card.repetitions,
+            models.Card.interval,
+            models.Card.ease_factor,
+            models.Card.tags,
+        )
+        .join(models.Deck)
+        .where(models.Card.id.in_(card_ids), models.Deck.owner_id == current_user.id)
+    ).all()
+    if len(rows) != len(card_ids):
+        raise HTTPException(status_code=404, detail="Card not found")
+
+    now = datetime.now(timezone.utc)
+    schedules = {
+        row.id: {
+            "id": row.id,
+            "repetitions": row.repetitions,
+            "interval": row.interval,
+            "ease_factor": row.ease_factor,
+            "next_review": None,
+        }
+        for row in rows
+    }
+
+    def reviewed_at(review: schemas.CardReviewItem) -> datetime:
+        if review.reviewed_at is None:
+            return now
+        if review.reviewed_at.tzinfo is None:
+            return review.reviewed_at.replace(tzinfo=timezone.utc)
+        return review.reviewed_at
+
+    for review in sorted(batch.reviews, key=reviewed_at):
+        schedule = schedules[review.card_id]
+        (
+            schedule["repetitions"],
+            schedule["interval"],
+            schedule["ease_factor"],
+            schedule["next_review"],
+        ) = calculate_sm2(
+            quality=review.rating,
+            repetitions=schedule["repetitions"],
+            previous_interval=schedule["interval"],
+            previous_ease_factor=schedule["ease_factor"],
+            reviewed_at=reviewed_at(review),
+        )
+
+    db.execute(update(models.Card), list(schedules.values()))
+    roadmap_service.apply_card_changes(
+        db,
+        current_user.id,
+        [
+            ((row.tags, row.interval), (row.tags, schedules[row.id]["interval"]))
+            for row in rows
+        ],
+    )
+    deck_service.touch_decks(db, [row.deck_id for row in rows])
+    db.commit()
+    return list(schedules.values())
+
+
 @router.get("/{card_id}", response_model=schemas.CardResponse)
 def read_card(
     card_id: int,
@@ -86,12 +329,18 @@ def update_card(
     if db_card is None:
         raise HTTPException(status_code=404, detail="Card not found")
 
+    before = (db_card.tags, db_card.interval)
     card_data = card.model_dump(exclude_unset=True)
     for key, value in card_data.items():
         setattr(db_card, key, value)
 
+    roadmap_service.apply_card_changes(
+        db, current_user.id, [(before, (db_card.tags, db_card.interval))]
+    )
+    deck_service.touch_decks(db, [db_card.deck_id])
     db.commit()
     db.refresh(db_card)
+    search_index.index_card(db_card, current_user.id)
     return db_card
 
 
@@ -110,8 +359,13 @@ def delete_card(
     if db_card is None:
         raise HTTPException(status_code=404, detail="Card not found")
 
+    roadmap_service.apply_card_changes(
+        db, current_user.id, [((db_card.tags, db_card.interval), None)]
+    )
+    deck_service.touch_decks(db, [db_card.deck_id])
     db.delete(db_card)
     db.commit()
+    search_index.remove_card(card_id)
     return {"message": "Card deleted successfully"}
 
 
@@ -131,6 +385,7 @@ def review_card(
     if db_card is None:
         raise HTTPException(status_code=404, detail="Card not found")
 
+    before = (db_card.tags, db_card.interval)
     new_reps, new_interval, new_ease, next_review = calculate_sm2(
         quality=review.rating,
         repetitions=db_card.repetitions,
@@ -143,6 +398,10 @@ def review_card(
     db_card.ease_factor = new_ease
     db_card.next_review = next_review
 
+    roadmap_service.apply_card_changes(
+        db, current_user.id, [(before, (db_card.tags, db_card.interval))]
+    )
+    deck_service.touch_decks(db, [db_card.deck_id])
     db.commit()
     db.refresh(db_card)
     return db_card
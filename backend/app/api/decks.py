@@ -1,31 +1,21 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from fastapi_filter import FilterDepends
 from ..database import get_db
-from .. import models, schemas, filters
+from .. import http_cache, models, schemas, filters
+from ..pagination import PageParams, page_params, paginate
+from ..services import deck_service, roadmap_service, search_index
 from .auth import get_current_user
 
 router = APIRouter()
 
 
-def _prepare_deck_response(deck: models.Deck) -> schemas.DeckResponse:
-    """Helper to populate DeckResponse fields from a Deck model."""
-    response = schemas.DeckResponse.model_validate(deck)
-    response.owner_username = deck.owner.username
-    response.likes_count = len(deck.likes)
-    response.forks_count = len(deck.forks)
-
-    # Calculate ratings
-    if deck.reviews:
-        response.rating_avg = sum(r.rating for r in deck.reviews) / len(deck.reviews)
-        response.rating_count = len(deck.reviews)
-    else:
-        response.rating_avg = 0.0
-        response.rating_count = 0
-
-    return response
+def _prepare_deck_response(db: Session, deck_id: int) -> schemas.DeckResponse:
+    """Helper to load a deck together with its aggregated social statistics."""
+    row = deck_service.get_deck_with_stats(db, deck_id)
+    return deck_service.to_deck_response(row)
 
 
 @router.post("/", response_model=schemas.DeckResponse)
@@ -38,54 +28,94 @@ def create_deck(
     db.add(db_deck)
     db.commit()
     db.refresh(db_deck)
-    return _prepare_deck_response(db_deck)
+    return _prepare_deck_response(db, db_deck.id)
 
 
-@router.get("/", response_model=List[schemas.DeckResponse])
+@router.get("/", response_model=List[schemas.DeckSummaryResponse])
 def read_decks(
+    response: Response,
     deck_filter: filters.DeckFilter = FilterDepends(filters.DeckFilter),
-    skip: int = 0,
-    limit: int = 100,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    """Fetch personal decks for the current user."""
-    query = db.query(models.Deck).filter(models.Deck.owner_id == current_user.id)
+    """Fetch personal decks for the current user as summaries (cards excluded)."""
+    query = deck_service.query_decks_with_stats(db).filter(
+        models.Deck.owner_id == current_user.id
+    )
 
     query = deck_filter.filter(query)
-    decks = query.offset(skip).limit(limit).all()
-    return [_prepare_deck_response(d) for d in decks]
+    rows = paginate(query, page, response, models.Deck.id)
+    return deck_service.to_deck_summaries(db, rows)
 
 
-@router.get("/marketplace", response_model=List[schemas.DeckResponse])
+@router.get("/marketplace", response_model=List[schemas.DeckSummaryResponse])
 def read_marketplace(
+    response: Response,
+    sort: Optional[Literal["likes", "forks", "rating", "trending"]] = None,
     deck_filter: filters.DeckFilter = FilterDepends(filters.DeckFilter),
-    skip: int = 0,
-    limit: int = 100,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    """Fetch all public decks in the marketplace."""
-    query = db.query(models.Deck).filter(models.Deck.is_public == True)
+    """
+    Fetch all public decks in the marketplace as summaries (cards excluded).
+    With `sort`, the most liked/forked/rated/trending decks come first; each
+    order is a scan of a partial index over public decks.
+    """
+    query = deck_service.query_decks_with_stats(db).filter(
+        models.Deck.is_public == True
+    )
     query = deck_filter.filter(query)
-    decks = query.offset(skip).limit(limit).all()
-    return [_prepare_deck_response(d) for d in decks]
+    rows = paginate(
+        query,
+        page,
+        response,
+        models.Deck.id,
+        sort_column=deck_service.MARKETPLACE_SORTS.get(sort),
+        descending=sort is not None,
+    )
+    return deck_service.to_deck_summaries(db, rows)
 
 
 @router.get("/{deck_id}", response_model=schemas.DeckResponse)
 def read_deck(
     deck_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    db_deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
-    if db_deck is None:
+    """
+    Fetch a deck with its cards. Public decks are validated by their
+    `updated_at` stamp alone: a matching ETag gets a 304 and an unchanged deck
+    is sent from the cached serialized body, without loading cards or stats.
+    Every input of the body bumps the stamp: deck edits, counter changes
+    (likes, forks, reviews), card writes and owner username changes.
+    """
+    stamp = (
+        db.query(models.Deck.is_public, models.Deck.owner_id, models.Deck.updated_at)
+        .filter(models.Deck.id == deck_id)
+        .first()
+    )
+    if stamp is None:
         raise HTTPException(status_code=404, detail="Deck not found")
 
-    if not db_deck.is_public and db_deck.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-
-    return _prepare_deck_response(db_deck)
+    if not stamp.is_public:
+        if stamp.owner_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+        return _prepare_deck_response(db, deck_id)
+
+    etag = http_cache.make_etag(deck_id, stamp.updated_at)
+    entry = http_cache.bodies.get(("deck", deck_id))
+    if entry is None or entry.etag != etag:
+        response = _prepare_deck_response(db, deck_id)
+        entry = http_cache.CachedBody(
+            body=http_cache.serialize(schemas.DeckResponse, response),
+            etag=etag,
+            last_modified=stamp.updated_at,
+        )
+        http_cache.bodies.set(("deck", deck_id), entry)
+    return http_cache.respond(request, entry, http_cache.DECK_CACHE_CONTROL)
 
 
 @router.put("/{deck_id}", response_model=schemas.DeckResponse)
@@ -109,7 +139,7 @@ def update_deck(
 
     db.commit()
     db.refresh(db_deck)
-    return _prepare_deck_response(db_deck)
+    return _prepare_deck_response(db, db_deck.id)
 
 
 @router.delete("/{deck_id}")
@@ -126,19 +156,32 @@ def delete_deck(
     if db_deck is None:
         raise HTTPException(status_code=404, detail="Deck not found")
 
+    if db_deck.parent_id is not None:
+        deck_service.bump_counters(
+            db,
+            db_deck.parent_id,
+            forks=-1,
+            trending=-deck_service.fork_trending_weight(
+                db_deck, deck_service.trending_epoch(db)
+            ),
+        )
     db.delete(db_deck)
+    roadmap_service.invalidate_node_mastery(db, current_user.id)
     db.commit()
+    search_index.remove_deck(deck_id)
     return {"message": "Deck deleted successfully"}
 
 
 @router.get("/{deck_id}/cards", response_model=List[schemas.CardResponse])
 def read_deck_cards(
     deck_id: int,
+    response: Response,
     card_filter: filters.CardFilter = FilterDepends(filters.CardFilter),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    """Fetch all cards in a specific deck."""
+    """Fetch the cards of a specific deck, one page at a time."""
     db_deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
     if db_deck is None:
         raise HTTPException(status_code=404, detail="Deck not found")
@@ -148,7 +191,15 @@ def read_deck_cards(
 
     query = db.query(models.Card).filter(models.Card.deck_id == deck_id)
     query = card_filter.filter(query)
-    return query.all()
+    rank = card_filter.rank_expression(query)
+    return paginate(
+        query,
+        page,
+        response,
+        models.Card.id,
+        sort_column=rank,
+        descending=rank is not None,
+    )
 
 
 @router.post("/{deck_id}/fork", response_model=schemas.DeckResponse)
@@ -173,23 +224,20 @@ def fork_deck(
     db.add(new_deck)
     db.flush()
 
-    for card in source_deck.cards:
-        new_card = models.Card(
-            deck_id=new_deck.id,
-            title=card.title,
-            code_snippet=card.code_snippet,
-            explanation=card.explanation,
-            language=card.language,
-            tags=card.tags,
-            ease_factor=2.5,
-            interval=0,
-            repetitions=0,
-        )
-        db.add(new_card)
-
+    deck_service.copy_cards(db, new_deck.id, models.Card.deck_id == source_deck.id)
+    deck_service.bump_counters(
+        db,
+        source_deck.id,
+        forks=1,
+        trending=deck_service.fork_trending_weight(
+            new_deck, deck_service.trending_epoch(db)
+        ),
+    )
+    roadmap_service.invalidate_node_mastery(db, current_user.id)
     db.commit()
     db.refresh(new_deck)
-    return _prepare_deck_response(new_deck)
+    search_index.index_deck(db, new_deck.id)
+    return _prepare_deck_response(db, new_deck.id)
 
 
 @router.post("/{deck_id}/like")
@@ -204,22 +252,13 @@ def like_deck(
     if not db_deck.is_public and db_deck.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Cannot like private deck")
 
-    existing_like = (
-        db.query(models.Like)
-        .filter(models.Like.user_id == current_user.id, models.Like.deck_id == deck_id)
-        .first()
-    )
-
-    if existing_like:
-        db.delete(existing_like)
-        message = "Deck unliked"
-    else:
-        new_like = models.Like(user_id=current_user.id, deck_id=deck_id)
-        db.add(new_like)
-        message = "Deck liked"
-
+    liked, counters = deck_service.toggle_like(db, deck_id, current_user.id)
     db.commit()
-    return {"message": message}
+    return {
+        "message": "Deck liked" if liked else "Deck unliked",
+        "liked": liked,
+        "likes_count": counters.likes_count,
+    }
 
 
 @router.post("/{deck_id}/reviews", response_model=schemas.ReviewResponse)
@@ -235,38 +274,26 @@ def create_review(
     if not db_deck.is_public and db_deck.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Cannot review private deck")
 
-    existing_review = (
-        db.query(models.Review)
-        .filter(
-            models.Review.user_id == current_user.id, models.Review.deck_id == deck_id
-        )
-        .first()
+    db_review, counters = deck_service.upsert_review(
+        db, deck_id, current_user.id, review.rating, review.comment
     )
-
-    if existing_review:
-        existing_review.rating = review.rating
-        existing_review.comment = review.comment
-        db.commit()
-        db.refresh(existing_review)
-        db_review = existing_review
-    else:
-        db_review = models.Review(
-            **review.model_dump(), user_id=current_user.id, deck_id=deck_id
-        )
-        db.add(db_review)
-        db.commit()
-        db.refresh(db_review)
-
+    # Serialized before the commit expires the row returned by the upsert
     response = schemas.ReviewResponse.model_validate(db_review)
+    db.commit()
+
     response.username = current_user.username
+    response.deck_rating_count = counters.rating_count
+    response.deck_rating_avg = (
+        counters.rating_sum / counters.rating_count if counters.rating_count else 0.0
+    )
     return response
 
 
 @router.get("/{deck_id}/reviews", response_model=List[schemas.ReviewResponse])
 def read_reviews(
     deck_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
@@ -277,13 +304,12 @@ def read_reviews(
     if not db_deck.is_public and db_deck.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    reviews = (
+    query = (
         db.query(models.Review)
+        .options(joinedload(models.Review.user))
         .filter(models.Review.deck_id == deck_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
     )
+    reviews = paginate(query, page, response, models.Review.id)
 
     result = []
     for r in reviews:
@@ -1,8 +1,8 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from ..database import get_db
-from .. import models, schemas
+from .. import http_cache, models, schemas
 from ..services import roadmap_service
 from .auth import get_current_user
 
@@ -10,9 +10,24 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.RoadmapResponse])
-def list_roadmaps(db: Session = Depends(get_db)):
-    """List all available canonical roadmaps."""
-    return db.query(models.Roadmap).all()
+def list_roadmaps(request: Request, db: Session = Depends(get_db)):
+    """
+    List all available canonical roadmaps.
+    Served from the cached serialized body while it is fresh; conditional
+    requests get a 304.
+    """
+    entry = http_cache.bodies.get(("roadmaps",))
+    if entry is None:
+        roadmaps = db.query(models.Roadmap).order_by(models.Roadmap.id).all()
+        entry = http_cache.CachedBody(
+            body=http_cache.serialize(List[schemas.RoadmapResponse], roadmaps),
+            etag=http_cache.make_etag(
+                *[(r.id, r.version, r.updated_at) for r in roadmaps]
+            ),
+            last_modified=max((r.updated_at for r in roadmaps), default=None),
+        )
+        http_cache.bodies.set(("roadmaps",), entry)
+    return http_cache.respond(request, entry, http_cache.ROADMAP_CACHE_CONTROL)
 
 
 @router.get("/subscriptions", response_model=List[schemas.RoadmapResponse])
@@ -26,14 +41,25 @@ def get_user_subscriptions(
 @router.get("/{roadmap_id}", response_model=schemas.RoadmapResponse)
 def get_roadmap(
     roadmap_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    """Get a specific roadmap and its full structure."""
-    roadmap = db.query(models.Roadmap).filter(models.Roadmap.id == roadmap_id).first()
-    if not roadmap:
-        raise HTTPException(status_code=404, detail="Roadmap not found")
-    return roadmap
+    """Get a specific roadmap and its full structure (cached like the list)."""
+    entry = http_cache.bodies.get(("roadmap", roadmap_id))
+    if entry is None:
+        roadmap = (
+            db.query(models.Roadmap).filter(models.Roadmap.id == roadmap_id).first()
+        )
+        if not roadmap:
+            raise HTTPException(status_code=404, detail="Roadmap not found")
+        entry = http_cache.CachedBody(
+            body=http_cache.serialize(schemas.RoadmapResponse, roadmap),
+            etag=http_cache.make_etag(roadmap.id, roadmap.version, roadmap.updated_at),
+            last_modified=roadmap.updated_at,
+        )
+        http_cache.bodies.set(("roadmap", roadmap_id), entry)
+    return http_cache.respond(request, entry, http_cache.ROADMAP_CACHE_CONTROL)
 
 
 @router.post(
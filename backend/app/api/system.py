@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from ..database import engine, pool_metrics
+from .. import models
+from ..services import ai_cache, ai_resilience
+from .auth import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/db-pool")
+def read_db_pool_metrics(current_user: models.User = Depends(get_current_user)):
+    """Connection pool checkout metrics, used to size workers and the pool."""
+    return pool_metrics.snapshot(engine)
+
+
+@router.get("/ai-cache")
+def read_ai_cache_metrics(current_user: models.User = Depends(get_current_user)):
+    """Hit and miss counts of the AI response cache."""
+    return ai_cache.stats()
+
+
+@router.get("/ai-providers")
+def read_ai_provider_health(current_user: models.User = Depends(get_current_user)):
+    """Circuit breaker state and latency percentiles of each AI provider."""
+    return ai_resilience.stats()
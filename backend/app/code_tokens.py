@@ -0,0 +1,181 @@
+import functools
+import re
+from typing import List, Optional
+
+# Card.language values (see the AI prompt) mapped to tokenizer families
+LANGUAGE_ALIASES = {
+    "python": "py",
+    "javascript": "js",
+    "typescript": "ts",
+    "jsx": "js",
+    "tsx": "ts",
+    "vue": "js",
+    "golang": "go",
+    "rs": "rust",
+    "c++": "cpp",
+    "rb": "ruby",
+    "bash": "sh",
+    "shell": "sh",
+}
+
+# Scope separators joining the parts of a qualified name, per language
+PATH_SEPARATORS = {
+    "rust": ("::", "."),
+    "cpp": ("::", "->", "."),
+    "php": ("::", "->"),
+    "ruby": ("::", "."),
+}
+DEFAULT_PATH_SEPARATORS = (".",)
+
+# Languages whose identifiers may contain hyphens (`btn-primary`, `--force`)
+HYPHENATED = {"css", "html", "sh"}
+
+# Sigils that are part of a name (`$var`, `@ivar`, decorators)
+SIGILS = {"php": "$", "sh": "$", "ruby": "@$", "py": "@", "js": "@", "ts": "@"}
+DEFAULT_SIGILS = "@$"
+
+KEYWORDS = {
+    "py": set(
+        "async await with for in def class yield from import lambda return not is "
+        "try except raise".split()
+    ),
+    "js": set(
+        "async await function const let new return export import from default "
+        "class extends yield typeof".split()
+    ),
+    "rust": set(
+        "async await fn let mut impl for pub use match move ref dyn unsafe where "
+        "trait struct enum".split()
+    ),
+    "go": set("go func defer chan select range type struct".split()),
+}
+KEYWORDS["ts"] = KEYWORDS["js"] | set("interface type readonly as keyof".split())
+ALL_KEYWORDS = set().union(*KEYWORDS.values())
+
+# Multi-character operators, longest first so `===` is not read as `==`
+OPERATORS = (
+    "<<= >>= **= //= ... === !== <=> :: -> => := ** // ?. ?? <- && || == != <= >= "
+    "+= -= *= /= %= |= &= ^= << >> ++ --"
+).split()
+_OPERATOR_RE = "|".join(re.escape(op) for op in OPERATORS)
+
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z0-9])|[A-Z]?[a-z0-9]+|[A-Z]+")
+
+
+def normalize_language(language: Optional[str]) -> str:
+    language = (language or "").lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
+
+def _separators_re(language: str) -> str:
+    separators = PATH_SEPARATORS.get(language, DEFAULT_PATH_SEPARATORS)
+    return "|".join(re.escape(separator) for separator in separators)
+
+
+@functools.lru_cache(maxsize=None)
+def _name_pattern(language: str) -> re.Pattern:
+    word = r"[A-Za-z0-9_\-]" if language in HYPHENATED else r"\w"
+    sigils = re.escape(SIGILS.get(language, DEFAULT_SIGILS))
+    separators = _separators_re(language)
+    sigil = f"[{sigils}]?" if sigils else ""
+    name = rf"{sigil}{word}+(?:(?:{separators}){word}+)*"
+    # A name, with a trailing "(" marking a call, or a standalone operator
+    return re.compile(rf"(?P<name>{name})(?P<call>\()?|(?P<op>{_OPERATOR_RE})")
+
+
+def identifier_parts(identifier: str) -> List[str]:
+    """Splits snake_case, camelCase and kebab-case identifiers into words."""
+    parts = []
+    for chunk in re.split(r"[_\-]+", identifier):
+        parts.extend(match.group(0).lower() for match in _CAMEL_RE.finditer(chunk))
+    return parts
+
+
+def _name_terms(name: str, language: str) -> List[str]:
+    lowered = name.lower()
+    terms = [lowered]
+    sigil = lowered[0] if not (lowered[0].isalnum() or lowered[0] in "_-") else ""
+    bare = lowered[len(sigil) :]
+    if sigil:
+        terms.append(bare)
+
+    segments = re.split(_separators_re(language), name[len(sigil) :])
+    if len(segments) > 1:
+        # Qualified name: `app.get` also yields `app` and `get`
+        terms.append(bare)
+        terms.extend(segment.lower() for segment in segments)
+    for segment in segments:
+        stripped = segment.strip("_-")
+        if stripped and stripped != segment.lower():
+            terms.append(stripped.lower())  # `__init__` -> `init`
+        words = identifier_parts(segment)
+        if len(words) > 1:
+            terms.extend(words)
+    return terms
+
+
+def tokenize_code(code: Optional[str], language: Optional[str] = None) -> List[str]:
+    """
+    Splits code into searchable terms: qualified names (`app.get`,
+    `std::io::Result`) and their segments, decorators and sigil names
+    (`@app.get`, `$var`), calls (`db.get(`, `get(`), identifier words
+    (`getUserById` -> get, user, by, id), multi-character operators (`=>`, `?.`)
+    and consecutive keyword pairs (`async with`). Terms are lowercased and
+    returned in first-seen order without duplicates.
+    """
+    if not code:
+        return []
+    language = normalize_language(language)
+    keywords = KEYWORDS.get(language, ALL_KEYWORDS)
+    terms: List[str] = []
+    previous_keyword = None
+
+    for match in _name_pattern(language).finditer(code):
+        if match.group("op"):
+            terms.append(match.group("op"))
+            previous_keyword = None
+            continue
+
+        name = match.group("name")
+        name_terms = _name_terms(name, language)
+        terms.extend(name_terms)
+        if match.group("call"):
+            # `app.get_items(` is also a call of `get_items(`
+            qualified = name_terms[0]
+            terms.append(f"{qualified}(")
+            terms.append(f"{re.split(_separators_re(language), qualified)[-1]}(")
+
+        lowered = name.lower()
+        if lowered in keywords:
+            if previous_keyword is not None:
+                terms.append(f"{previous_keyword} {lowered}")
+            previous_keyword = lowered
+        else:
+            previous_keyword = None
+
+    return list(dict.fromkeys(term for term in terms if term))
+
+
+def query_terms(query: str, language: Optional[str] = None) -> List[str]:
+    """
+    Terms a symbol query must match. Only the most specific form of each name is
+    kept, so `@app.get` looks up `@app.get` rather than also `app` and `get`.
+    """
+    language = normalize_language(language)
+    terms = []
+    keywords = KEYWORDS.get(language, ALL_KEYWORDS)
+    previous_keyword = None
+    for match in _name_pattern(language).finditer(query):
+        if match.group("op"):
+            terms.append(match.group("op"))
+            previous_keyword = None
+            continue
+        name = match.group("name").lower()
+        if match.group("call"):
+            terms.append(f"{name}(")
+        elif name in keywords and previous_keyword is not None:
+            terms[-1] = f"{previous_keyword} {name}"
+        else:
+            terms.append(name)
+        previous_keyword = name if name in keywords else None
+    return list(dict.fromkeys(terms))
@@ -1,5 +1,9 @@
-from sqlalchemy import create_engine
+import threading
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import QueuePool
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,15 +14,151 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 30  # 30 days
     INTERNAL_AUTH_SECRET: str = "handshake-secret"  # Must match frontend
     ALLOWED_ORIGINS: str = "*"
+    # Worker threads for sync routes and dependencies; keep at or below the
+    # connection pool capacity (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    THREADPOOL_SIZE: int = 30
+    USER_CACHE_TTL_SECONDS: int = 60  # Authenticated user lookups, 0 disables
+    USER_CACHE_MAX_SIZE: int = 10000
+
+    # AI provider clients
+    AI_CLIENT_CACHE_SIZE: int = 256  # Pooled SDK clients per process
+    AI_PROVIDER_TIMEOUT_SECONDS: float = 60.0  # Per HTTP attempt
+    AI_PROVIDER_MAX_RETRIES: int = 2
+    AI_REQUEST_DEADLINE_SECONDS: float = 120.0  # Whole call incl. retries, 0 disables
+    AI_BATCH_CONCURRENCY: int = 5  # Provider calls in flight per batch request
+    # Provider resilience
+    AI_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures opening the circuit
+    AI_BREAKER_RESET_SECONDS: float = 30.0  # Open time before a trial call
+    AI_LATENCY_WINDOW: int = 200  # Recent latencies kept per provider
+    AI_HEDGE_MIN_SAMPLES: int = 20  # Samples needed before hedging at p95
+    AI_HEDGE_DEFAULT_DELAY_SECONDS: float = 10.0  # Hedge delay until then
+    # Opt-in response cache for identical generations
+    AI_CACHE_BACKEND: str = "memory"  # "memory" or "disk"
+    AI_CACHE_PATH: str = "ai_cache.sqlite3"  # Used by the disk backend
+    AI_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 7  # 0 keeps entries until evicted
+    AI_CACHE_MAX_SIZE: int = 10000
+
+    # HTTP caching of roadmaps and public decks (ETag / Last-Modified)
+    ROADMAP_MAX_AGE_SECONDS: int = 300  # Cache-Control max-age for roadmaps
+    RESPONSE_CACHE_TTL_SECONDS: int = 300  # Serialized bodies kept server-side
+    RESPONSE_CACHE_MAX_SIZE: int = 1000
+
+    # In-memory card search index for type-ahead (per process)
+    SEARCH_INDEX_ENABLED: bool = False
+    SEARCH_INDEX_REFRESH_SECONDS: int = 300  # Full rebuild period, 0 disables
+
+    # Connection pool (ignored for SQLite)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    # Server-side timeouts in milliseconds (PostgreSQL only), 0 disables
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: int = 60000
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
     )
 
 
+def engine_options(settings: Settings) -> dict:
+    """Builds create_engine keyword arguments for the configured database."""
+    backend = make_url(settings.DATABASE_URL).get_backend_name()
+    if backend == "sqlite":
+        return {}
+
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if backend == "postgresql":
+        server_options = []
+        if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+            server_options.append(
+                f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+            )
+        if settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS > 0:
+            server_options.append(
+                "-c idle_in_transaction_session_timeout="
+                f"{settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS}"
+            )
+        if server_options:
+            options["connect_args"] = {"options": " ".join(server_options)}
+    return options
+
+
+def pool_capacity(settings: Settings) -> Optional[int]:
+    """Connections one process can hold at once, or None when unpooled (SQLite)."""
+    options = engine_options(settings)
+    if not options:
+        return None
+    return options["pool_size"] + options["max_overflow"]
+
+
+class PoolMetrics:
+    """
+    Counts connection pool activity through pool events, to size workers and pools.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def attach(self, engine):
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, engine) -> dict:
+        pool = engine.pool
+        with self._lock:
+            metrics = {
+                "checkouts_total": self.checkouts,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "connects_total": self.connects,
+                "invalidations_total": self.invalidations,
+            }
+        metrics["pool"] = pool.status()
+        if isinstance(pool, QueuePool):
+            metrics["pool_size"] = pool.size()
+            metrics["pool_checkedin"] = pool.checkedin()
+            metrics["pool_overflow"] = pool.overflow()
+        return metrics
+
+
 settings = Settings()
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+pool_metrics = PoolMetrics()
+pool_metrics.attach(engine)
 
 
 class Base(DeclarativeBase):
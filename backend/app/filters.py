@@ -1,14 +1,72 @@
-from typing import Optional, List, Union, Any
+from typing import Optional, List, Literal, Union, Any
 from fastapi_filter.contrib.sqlalchemy import Filter
-from sqlalchemy import func, or_, cast, String
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import and_, func, or_, cast, select, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, JSONPATH
 from pydantic import field_validator
 from .models import Card, Deck
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def tags_predicate(dialect: str, tags: List[str], match: Optional[str] = "all"):
+    """
+    Builds the WHERE clause matching cards by exact tags.
+
+    A tag ending in `:*` (e.g. `lang:*`) matches any tag of that namespace.
+    With `match="all"` every tag must be present, with `"any"` one is enough.
+    On PostgreSQL exact tags become one JSONB containment test (`@>` for all,
+    `?|` for any) served by the GIN index on `tags`, and namespaces one array
+    test (`@>` / `&&`) served by the expression index on
+    `card_tag_namespaces(tags)`. Only a nested prefix such as `a:b:*` falls
+    back to an unindexed JSON path scan.
+    """
+    exact = [tag for tag in tags if not tag.endswith(":*")]
+    prefixes = [tag[:-1] for tag in tags if tag.endswith(":*")]
+    predicates = []
+
+    if dialect == "postgresql":
+        if exact and match == "any":
+            predicates.append(Card.tags.op("?|")(cast(exact, ARRAY(Text))))
+        elif exact:
+            predicates.append(Card.tags.op("@>")(cast(exact, JSONB)))
+        namespaces = [prefix[:-1] for prefix in prefixes if prefix.count(":") == 1]
+        nested = [prefix for prefix in prefixes if prefix.count(":") != 1]
+        if namespaces:
+            operator = "&&" if match == "any" else "@>"
+            predicates.append(
+                func.card_tag_namespaces(Card.tags).op(operator)(
+                    cast(namespaces, ARRAY(Text))
+                )
+            )
+        for prefix in nested:
+            predicates.append(
+                func.jsonb_path_exists(
+                    Card.tags,
+                    cast("$[*] ? (@ starts with $prefix)", JSONPATH),
+                    cast({"prefix": prefix}, JSONB),
+                )
+            )
+    else:
+        # SQLite: probe the unnested array
+        def has_tag(condition):
+            tag = func.json_each(Card.tags).table_valued("value")
+            return select(1).select_from(tag).where(condition(tag.c.value)).exists()
+
+        for value in exact:
+            predicates.append(has_tag(lambda column: column == value))
+        for prefix in prefixes:
+            pattern = _escape_like(prefix) + "%"
+            predicates.append(has_tag(lambda column: column.like(pattern, escape="\\")))
+
+    return or_(*predicates) if match == "any" else and_(*predicates)
+
+
 class CardFilter(Filter):
     language: Optional[str] = None
     tags__contains: Optional[List[str]] = None
+    tags_match: Optional[Literal["all", "any"]] = "all"
     title__ilike: Optional[str] = None
     explanation__ilike: Optional[str] = None
     search: Optional[str] = None
@@ -17,7 +75,7 @@ class CardFilter(Filter):
     @classmethod
     def split_tags(cls, v: Any) -> Any:
         if isinstance(v, str):
-            return [v]
+            return [tag.strip() for tag in v.split(",") if tag.strip()]
         return v
 
     def filter(self, query):
@@ -43,7 +101,7 @@ class CardFilter(Filter):
                         Card.code_snippet.ilike(f"%{search_term}%"),
                         cast(Card.tags, String).ilike(f"%{search_term}%"),
                     )
-                ).order_by(func.similarity(Card.title, search_term).desc())
+                )
             else:
                 # Fallback for SQLite/other dialects in tests
                 query = query.filter(
@@ -58,20 +116,31 @@ class CardFilter(Filter):
         # 2. Handle Tags
 
         tags = self.tags__contains
+        tags_match = self.tags_match
         self.tags__contains = None
+        self.tags_match = None
 
         query = super().filter(query)
 
         # Restore fields for potential later use (though usually not needed after filter)
         self.search = search_term
         self.tags__contains = tags
+        self.tags_match = tags_match
 
         if tags:
-            for tag in tags:
-                query = query.filter(cast(Card.tags, String).ilike(f"%{tag}%"))
+            query = query.filter(tags_predicate(dialect, tags, self.tags_match))
 
         return query
 
+    def rank_expression(self, query):
+        """
+        Returns the relevance expression results should be ordered by (descending),
+        or None when the natural (id) order applies.
+        """
+        if self.search and query.session.bind.dialect.name == "postgresql":
+            return func.similarity(Card.title, self.search)
+        return None
+
     class Constants(Filter.Constants):
         model = Card
         # search_field_name = "search" # Handled manually
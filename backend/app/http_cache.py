@@ -0,0 +1,95 @@
+import functools
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from .cache import TTLCache
+from .database import settings
+
+# Roadmaps only change at ingest time, so clients may reuse them for a while
+ROADMAP_CACHE_CONTROL = f"public, max-age={settings.ROADMAP_MAX_AGE_SECONDS}"
+# Public decks change with every like, review or card edit: always revalidate
+DECK_CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime] = None
+
+
+# Serialized response bodies, keyed by resource (e.g. ("roadmap", id)). Per
+# process: roadmap bodies are trusted until they expire, so a roadmap ingest is
+# seen by other workers only after RESPONSE_CACHE_TTL_SECONDS. Deck bodies are
+# revalidated against the deck's updated_at on every read.
+bodies = TTLCache(
+    maxsize=settings.RESPONSE_CACHE_MAX_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag derived from the values that version a resource."""
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes, stored in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@functools.lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def serialize(schema: Any, value: Any) -> bytes:
+    """Validates ORM objects (or models) against `schema` and dumps them as JSON."""
+    adapter = _adapter(schema)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> bool:
+    """
+    Evaluates the conditional headers of a GET. If-None-Match (weak comparison)
+    takes precedence over If-Modified-Since, as in RFC 9110.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        opaque = etag.removeprefix("W/")
+        return any(
+            tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have second precision
+        return _utc(last_modified).replace(microsecond=0) <= _utc(since)
+    return False
+
+
+def respond(request: Request, entry: CachedBody, cache_control: str) -> Response:
+    """Sends the cached body, or an empty 304 if the client's copy is current."""
+    headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+    if entry.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            _utc(entry.last_modified), usegmt=True
+        )
+    if is_not_modified(request, entry.etag, entry.last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
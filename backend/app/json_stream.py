@@ -0,0 +1,104 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JSONFieldStream:
+    """
+    Incremental parser for the top-level fields of a JSON object arriving in chunks.
+
+    Text before the opening brace (such as a ```json fence) is skipped. Each
+    call to `feed` returns the (key, value) pairs completed by that chunk, so
+    callers can show a field as soon as its closing quote or bracket arrives
+    rather than after the whole document.
+    """
+
+    def __init__(self):
+        self._state = "object"
+        self._buffer: List[str] = []
+        self._key: Optional[str] = None
+        self._in_string = False
+        self._escaped = False
+        self._nesting = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        fields = []
+        for char in chunk:
+            if self.done:
+                break
+            field = self._consume(char)
+            if field is not None:
+                fields.append(field)
+        return fields
+
+    def _consume(self, char: str) -> Optional[Tuple[str, Any]]:
+        state = self._state
+        if state == "object":
+            if char == "{":
+                self._state = "key"
+        elif state == "key":
+            if char == '"':
+                self._state = "key_string"
+                self._buffer = [char]
+            elif char == "}":
+                self.done = True
+        elif state == "key_string":
+            self._buffer.append(char)
+            if self._string_closed(char):
+                self._key = json.loads("".join(self._buffer))
+                self._state = "colon"
+        elif state == "colon":
+            if char == ":":
+                self._state = "value"
+                self._buffer = []
+                self._nesting = 0
+        elif state == "value":
+            return self._consume_value(char)
+        return None
+
+    def _consume_value(self, char: str) -> Optional[Tuple[str, Any]]:
+        if not self._buffer and char.isspace():
+            return None
+
+        if self._in_string:
+            self._buffer.append(char)
+            if self._string_closed(char) and self._nesting == 0:
+                return self._emit()
+            return None
+
+        if char in ",}" and self._nesting == 0:
+            # End of a scalar value (number, true, false, null)
+            field = self._emit() if self._buffer else None
+            if char == "}":
+                self.done = True
+            return field
+
+        self._buffer.append(char)
+        if char == '"':
+            self._in_string = True
+            self._escaped = False
+        elif char in "[{":
+            self._nesting += 1
+        elif char in "]}":
+            self._nesting -= 1
+            if self._nesting == 0:
+                return self._emit()
+        return None
+
+    def _string_closed(self, char: str) -> bool:
+        """Tracks escapes inside a string; True when `char` is its closing quote."""
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == '"' and len(self._buffer) > 1:
+            self._in_string = False
+            return True
+        return False
+
+    def _emit(self) -> Tuple[str, Any]:
+        field = (self._key, json.loads("".join(self._buffer).strip()))
+        self._state = "key"
+        self._buffer = []
+        self._in_string = False
+        return field
@@ -1,7 +1,14 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base, settings
-from .api import decks, cards, ai, auth, roadmaps
+from .database import engine, Base, SessionLocal, pool_capacity, settings
+from .api import decks, cards, ai, auth, roadmaps, system
+from .pagination import NEXT_CURSOR_HEADER
+from .services import ai_clients, search_index
 
 # Create database tables
 # In a real app, we'd use Alembic migrations
@@ -9,8 +16,60 @@ from . import models
 
 Base.metadata.create_all(bind=engine)
 
+logger = logging.getLogger(__name__)
+
+
+def _rebuild_search_index():
+    db = SessionLocal()
+    try:
+        search_index.rebuild(db)
+    finally:
+        db.close()
+
+
+async def _refresh_search_index(interval: int):
+    # Each worker process holds its own index; periodic rebuilds pick up
+    # changes made through the other workers.
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_rebuild_search_index)
+        except Exception:
+            logger.exception("Search index refresh failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync routes and dependencies (all database access) run in this threadpool
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.THREADPOOL_SIZE
+    capacity = pool_capacity(settings)
+    if capacity is not None and settings.THREADPOOL_SIZE > capacity:
+        # Threads beyond the pool capacity block on DB_POOL_TIMEOUT under load
+        logger.warning(
+            "THREADPOOL_SIZE=%d exceeds the database pool capacity of %d "
+            "(DB_POOL_SIZE + DB_MAX_OVERFLOW)",
+            settings.THREADPOOL_SIZE,
+            capacity,
+        )
+
+    refresher = None
+    if search_index.enabled():
+        await run_in_threadpool(_rebuild_search_index)
+        if settings.SEARCH_INDEX_REFRESH_SECONDS > 0:
+            refresher = asyncio.create_task(
+                _refresh_search_index(settings.SEARCH_INDEX_REFRESH_SECONDS)
+            )
+    yield
+    if refresher is not None:
+        refresher.cancel()
+    await ai_clients.close_clients()
+
+
 app = FastAPI(
-    title="SyntaxRecall API", swagger_ui_parameters={"persistAuthorization": True}
+    title="SyntaxRecall API",
+    swagger_ui_parameters={"persistAuthorization": True},
+    lifespan=lifespan,
 )
 
 # CORS Configuration
@@ -24,6 +83,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -38,3 +98,4 @@ app.include_router(decks.router, prefix="/api/decks", tags=["decks"])
 app.include_router(cards.router, prefix="/api/cards", tags=["cards"])
 app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
 app.include_router(roadmaps.router, prefix="/api/roadmaps", tags=["roadmaps"])
+app.include_router(system.router, prefix="/api/system", tags=["system"])
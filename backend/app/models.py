@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import (
@@ -13,12 +13,22 @@ from sqlalchemy import (
     Integer,
     Index,
     event,
+    inspect,
     DDL,
+    case,
+    cast,
+    UniqueConstraint,
 )
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from .code_tokens import tokenize_code
 from .database import Base
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 # Database Events
 event.listen(
     Base.metadata,
@@ -55,7 +65,9 @@ class Like(Base):
     __tablename__ = "likes"
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
-    deck_id: Mapped[int] = mapped_column(ForeignKey("decks.id"), primary_key=True)
+    deck_id: Mapped[int] = mapped_column(
+        ForeignKey("decks.id"), primary_key=True, index=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -66,10 +78,16 @@ class Like(Base):
 
 class Review(Base):
     __tablename__ = "reviews"
+    # One review per user and deck; also the conflict target of review upserts
+    __table_args__ = (
+        UniqueConstraint("user_id", "deck_id", name="uq_review_user_deck"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    deck_id: Mapped[int] = mapped_column(ForeignKey("decks.id"), nullable=False)
+    deck_id: Mapped[int] = mapped_column(
+        ForeignKey("decks.id"), nullable=False, index=True
+    )
     rating: Mapped[int] = mapped_column(Integer, nullable=False)  # 1-5 stars
     comment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -98,9 +116,32 @@ class Deck(Base):
     title: Mapped[str] = mapped_column(String(255), index=True, nullable=False)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     is_public: Mapped[bool] = mapped_column(Boolean, default=False)
-    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     parent_id: Mapped[Optional[int]] = mapped_column(
-        ForeignKey("decks.id"), nullable=True
+        ForeignKey("decks.id"), nullable=True, index=True
+    )
+
+    # Denormalized social counters, maintained in the same transaction as the
+    # like/fork/review they count (see deck_service.bump_counters)
+    likes_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    forks_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Forward-decayed engagement (see deck_service.trending_weight)
+    trending_score: Mapped[float] = mapped_column(
+        Float, default=0.0, server_default="0"
+    )
+    # Null for decks created before the column existed
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=utcnow
+    )
+    # Version stamp of everything a deck read returns (metadata, counters,
+    # cards): it validates HTTP caches. Set in Python for sub-second precision.
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        default=utcnow,
+        onupdate=utcnow,
     )
 
     owner: Mapped["User"] = relationship(
@@ -120,6 +161,51 @@ class Deck(Base):
         back_populates="forks", remote_side=[id]
     )
 
+    @hybrid_property
+    def rating_avg(self) -> float:
+        return self.rating_sum / self.rating_count if self.rating_count else 0.0
+
+    @rating_avg.inplace.expression
+    @classmethod
+    def _rating_avg_expression(cls):
+        return case(
+            (
+                cls.rating_count > 0,
+                cast(cls.rating_sum, Float) / cast(cls.rating_count, Float),
+            ),
+            else_=0.0,
+        )
+
+
+# Marketplace sort orders: (sort key, id) keyset scans over public decks
+for _name, _key in [
+    ("likes", Deck.likes_count),
+    ("forks", Deck.forks_count),
+    ("rating", Deck.rating_avg),
+    ("trending", Deck.trending_score),
+]:
+    Index(
+        f"idx_deck_public_{_name}",
+        _key,
+        Deck.id,
+        postgresql_where=Deck.is_public,
+    )
+
+
+class TrendingEpoch(Base):
+    """
+    Single row holding the current epoch of Deck.trending_score.
+
+    Forward-decayed weights grow with the time since the epoch, so
+    deck_service.rebase_trending moves it forward and rescales every score
+    before they overflow. Absent until the first rebase.
+    """
+
+    __tablename__ = "trending_epoch"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    epoch: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
 
 class Card(Base):
     """
@@ -144,6 +230,10 @@ class Card(Base):
     tags: Mapped[list] = mapped_column(
         JSON().with_variant(JSONB, "postgresql"), default=list
     )
+    # Code-aware search terms derived from code_snippet (see code_tokens)
+    code_terms: Mapped[Optional[list]] = mapped_column(
+        JSON().with_variant(JSONB, "postgresql"), nullable=True
+    )
 
     # Roadmap Linking
     roadmap_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
@@ -167,8 +257,13 @@ class Card(Base):
     deck: Mapped["Deck"] = relationship(back_populates="cards")
 
 
+# Study queue: serves deck lookups and the per-deck "due cards" range scans
+# ordered by (next_review, id)
+Index("idx_card_deck_next_review", Card.deck_id, Card.next_review, Card.id)
+
 # GIN and Trigram Indexes
 Index("idx_card_tags_gin", Card.tags, postgresql_using="gin")
+Index("idx_card_code_terms_gin", Card.code_terms, postgresql_using="gin")
 Index(
     "idx_card_title_trgm",
     Card.title,
@@ -189,6 +284,67 @@ Index(
 )
 
 
+# Weighted full-text document for ranked search (PostgreSQL only): title > tags >
+# explanation > code. A stored generated column, so it never drifts from the row.
+CARD_SEARCH_DDL = [
+    DDL(
+        "ALTER TABLE cards ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(jsonb_to_tsvector('simple', coalesce(tags, '[]'::jsonb), "
+        "'[\"string\"]'), 'B') || "
+        "setweight(to_tsvector('english', coalesce(explanation, '')), 'C') || "
+        "setweight(to_tsvector('simple', coalesce(code_snippet, '')), 'D')"
+        ") STORED"
+    ),
+    DDL(
+        "CREATE INDEX IF NOT EXISTS idx_card_search_vector "
+        "ON cards USING gin (search_vector)"
+    ),
+]
+for statement in CARD_SEARCH_DDL:
+    event.listen(
+        Card.__table__, "after_create", statement.execute_if(dialect="postgresql")
+    )
+
+
+# Tag namespaces ("lang" for "lang:python") for `ns:*` tag filters (PostgreSQL
+# only). GIN indexes on JSONB cannot serve prefix matches, so an immutable
+# function maps the tags to their namespaces and an expression index covers it.
+CARD_TAG_NAMESPACES_DDL = [
+    DDL(
+        "CREATE OR REPLACE FUNCTION card_tag_namespaces(tags jsonb) RETURNS text[] "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ "
+        "SELECT coalesce(array_agg(DISTINCT split_part(tag, ':', 1)), '{}') "
+        "FROM jsonb_array_elements_text(CASE WHEN jsonb_typeof(tags) = 'array' "
+        "THEN tags ELSE '[]'::jsonb END) AS tag WHERE strpos(tag, ':') > 0 $$"
+    ),
+    DDL(
+        "CREATE INDEX IF NOT EXISTS idx_card_tag_namespaces "
+        "ON cards USING gin (card_tag_namespaces(tags))"
+    ),
+]
+for statement in CARD_TAG_NAMESPACES_DDL:
+    event.listen(
+        Card.__table__, "after_create", statement.execute_if(dialect="postgresql")
+    )
+
+
+@event.listens_for(Card, "before_insert")
+def _index_code_on_insert(mapper, connection, target: Card):
+    target.code_terms = tokenize_code(target.code_snippet, target.language)
+
+
+@event.listens_for(Card, "before_update")
+def _index_code_on_update(mapper, connection, target: Card):
+    state = inspect(target)
+    if (
+        state.attrs.code_snippet.history.has_changes()
+        or state.attrs.language.history.has_changes()
+    ):
+        target.code_terms = tokenize_code(target.code_snippet, target.language)
+
+
 class Roadmap(Base):
     __tablename__ = "roadmaps"
 
@@ -220,3 +376,24 @@ class RoadmapSubscription(Base):
 
     user: Mapped["User"] = relationship(back_populates="roadmap_subscriptions")
     roadmap: Mapped["Roadmap"] = relationship(back_populates="subscriptions")
+
+
+class RoadmapNodeMastery(Base):
+    """
+    Materialized per-user mastery counters for each node of a roadmap.
+
+    Rows are built on the first mastery read for a (user, roadmap) pair and then
+    maintained incrementally as the user's cards are created, edited, reviewed
+    or deleted. Bulk card operations drop the user's rows so they are rebuilt.
+    """
+
+    __tablename__ = "roadmap_node_mastery"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    roadmap_id: Mapped[str] = mapped_column(
+        ForeignKey("roadmaps.id"), primary_key=True
+    )
+    node_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    total_cards: Mapped[int] = mapped_column(Integer, default=0)
+    mastered_cards: Mapped[int] = mapped_column(Integer, default=0)
@@ -0,0 +1,117 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class PageParams:
+    cursor: Optional[str]
+    limit: int
+
+
+def page_params(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> PageParams:
+    """Dependency exposing the `cursor` and `limit` query parameters."""
+    return PageParams(cursor=cursor, limit=limit)
+
+
+def _encode_value(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported cursor value: {value!r}")
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encodes the sort key values of the last row of a page into an opaque token."""
+    raw = json.dumps(values, separators=(",", ":"), default=_encode_value).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decodes a token produced by encode_cursor, rejecting anything malformed.
+
+    Sort key values come back as numbers or, for timestamps, as datetimes; the
+    trailing id must be an integer.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("wrong shape")
+        if not isinstance(values[-1], int) or isinstance(values[-1], bool):
+            raise ValueError("id is not an integer")
+        values = [_decode_sort_value(value) for value in values[:-1]] + values[-1:]
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _decode_sort_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError(f"Unsupported cursor value: {value!r}")
+    return value
+
+
+def paginate(
+    query,
+    page: PageParams,
+    response: Response,
+    id_column,
+    sort_column=None,
+    descending: bool = False,
+):
+    """
+    Applies keyset pagination on (sort_column, id_column) to a query.
+
+    Rows after the cursor are selected with a row-value comparison on the sort
+    keys, so every page is a bounded index range scan whatever its depth. When
+    more rows remain, the cursor for the next page is returned in the
+    X-Next-Cursor response header.
+
+    Args:
+        query: ORM query to paginate. Must not already be ordered.
+        page: Cursor and page size from page_params.
+        response: Response whose headers receive the next cursor.
+        id_column: Unique tie-breaker column (usually the primary key).
+        sort_column: Optional primary sort expression, ordered before id_column.
+        descending: Whether the keys are ordered from largest to smallest.
+
+    Returns:
+        The rows of the requested page, shaped like the rows of `query`.
+    """
+    keys = [id_column] if sort_column is None else [sort_column, id_column]
+    single_entity = len(query.column_descriptions) == 1
+
+    if page.cursor:
+        values = decode_cursor(page.cursor, len(keys))
+        if descending:
+            query = query.filter(tuple_(*keys) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*keys) > tuple_(*values))
+
+    query = query.add_columns(
+        *[key.label(f"page_key_{i}") for i, key in enumerate(keys)]
+    ).order_by(*[key.desc() if descending else key.asc() for key in keys])
+
+    rows = query.limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            list(rows[-1][-len(keys) :])
+        )
+
+    return [row[0] if single_entity else row for row in rows]
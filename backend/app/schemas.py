@@ -78,6 +78,10 @@ class CardResponse(CardBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CardSearchResponse(CardResponse):
+    score: float
+
+
 # Deck Schemas
 class DeckBase(BaseModel):
     title: str
@@ -95,7 +99,7 @@ class DeckUpdate(BaseModel):
     is_public: Optional[bool] = None
 
 
-class DeckResponse(DeckBase):
+class DeckSummaryResponse(DeckBase):
     id: int
     owner_id: int
     owner_username: Optional[str] = None
@@ -104,17 +108,40 @@ class DeckResponse(DeckBase):
     rating_avg: float = 0.0
     rating_count: int = 0
     parent_id: Optional[int] = None
-    cards: List[CardResponse] = []
+    card_count: int = 0
+    languages: List[str] = []
+    top_tags: List[str] = []
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class DeckResponse(DeckSummaryResponse):
+    cards: List[CardResponse] = []
+
+
 # AI Generation Schemas
+class AIFallback(BaseModel):
+    provider: str
+    api_key: str
+    model: str
+
+
 class AIPromptRequest(BaseModel):
     prompt: str
     provider: str
     api_key: str
     model: str
+    use_cache: bool = False
+    fallback: Optional[AIFallback] = None
+
+
+class AIBatchPromptRequest(BaseModel):
+    prompts: List[str] = Field(min_length=1, max_length=100)
+    provider: str
+    api_key: str
+    model: str
+    use_cache: bool = False
+    fallback: Optional[AIFallback] = None
 
 
 class AITestRequest(BaseModel):
@@ -136,6 +163,23 @@ class CardReview(BaseModel):
     rating: int = Field(..., ge=0, le=5)  # SM-2 uses 0-5
 
 
+class CardReviewItem(CardReview):
+    card_id: int
+    reviewed_at: Optional[datetime] = None  # Defaults to the time of submission
+
+
+class CardReviewBatch(BaseModel):
+    reviews: List[CardReviewItem] = Field(..., min_length=1, max_length=1000)
+
+
+class CardScheduleResponse(BaseModel):
+    id: int
+    ease_factor: float
+    interval: int
+    repetitions: int
+    next_review: datetime
+
+
 # Community Review/Rating Schemas
 class ReviewBase(BaseModel):
     rating: int = Field(..., ge=1, le=5)
@@ -153,6 +197,9 @@ class ReviewResponse(ReviewBase):
     username: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    # Deck rating after this review was written (set by POST only)
+    deck_rating_avg: Optional[float] = None
+    deck_rating_count: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+from starlette.concurrency import run_in_threadpool
+from ..cache import TTLCache
+from ..database import settings
+
+
+class DiskCache:
+    """
+    Size-bounded cache of JSON values with expiry, stored in a local SQLite file.
+
+    Offers the TTLCache interface so both can back the AI response cache. The
+    file survives restarts and is shared by every worker process on the host.
+    Least recently used entries are evicted once `maxsize` is exceeded.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int,
+        ttl: Optional[float],
+        timer: Callable[[], float] = time.time,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_accessed_at "
+                "ON entries (accessed_at)"
+            )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = self.timer()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return default
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        now = self.timer()
+        expires_at = None if self.ttl is None else now + self.ttl
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        return default if row is None else json.loads(row[0])
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            return {
+                "size": size,
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self) -> int:
+        return self.stats()["size"]
+
+
+def _build_cache():
+    ttl = settings.AI_CACHE_TTL_SECONDS or None
+    if settings.AI_CACHE_BACKEND == "disk":
+        return DiskCache(settings.AI_CACHE_PATH, settings.AI_CACHE_MAX_SIZE, ttl)
+    return TTLCache(settings.AI_CACHE_MAX_SIZE, ttl)
+
+
+response_cache = _build_cache()
+
+
+def cache_key(template_version: int, prompt: str, provider: str, model: str) -> str:
+    """
+    Content address of a generation: the prompt with case and whitespace
+    normalized, the provider, the model and the version of the prompt template.
+    """
+    normalized = re.sub(r"\s+", " ", prompt).strip().lower()
+    raw = json.dumps([template_version, normalized, provider, model])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def lookup(key: str) -> Optional[dict]:
+    if isinstance(response_cache, DiskCache):
+        return await run_in_threadpool(response_cache.get, key)
+    return response_cache.get(key)
+
+
+async def store(key: str, card: dict):
+    if isinstance(response_cache, DiskCache):
+        await run_in_threadpool(response_cache.set, key, card)
+    else:
+        response_cache.set(key, card)
+
+
+def stats() -> dict:
+    metrics = response_cache.stats()
+    lookups = metrics["hits"] + metrics["misses"]
+    metrics["backend"] = settings.AI_CACHE_BACKEND
+    metrics["hit_rate"] = metrics["hits"] / lookups if lookups else 0.0
+    return metrics
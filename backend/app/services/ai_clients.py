@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Dict, TypeVar
+import anthropic
+import google.ai.generativelanguage as glm
+from groq import AsyncGroq
+from openai import AsyncOpenAI
+from ..cache import TTLCache
+from ..database import settings
+
+PROVIDERS = ("gemini", "openai", "anthropic", "groq", "qwen")
+QWEN_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
+T = TypeVar("T")
+
+# Evicted clients whose close is still pending, by the task that will close them
+_closing: Dict[asyncio.Task, object] = {}
+
+
+async def _close(client):
+    if isinstance(client, glm.GenerativeServiceAsyncClient):
+        await client.transport.close()
+    else:
+        await client.close()
+
+
+async def _close_when_idle(client):
+    # An evicted client may still serve in-flight calls; they are all cancelled
+    # by the request deadline, so close its pool once that has passed.
+    await asyncio.sleep(max(settings.AI_REQUEST_DEADLINE_SECONDS, 0))
+    await _close(client)
+
+
+def _on_evict(key, client):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(_close(client))
+        return
+    task = loop.create_task(_close_when_idle(client))
+    _closing[task] = client
+    task.add_done_callback(lambda done: _closing.pop(done, None))
+
+
+# Async SDK clients keyed by (provider, api key hash). Each client owns a
+# keep-alive connection pool, so reusing it skips the TLS handshake per request.
+# Clients evicted by the size bound have their pool closed.
+_clients = TTLCache(settings.AI_CLIENT_CACHE_SIZE, None, on_evict=_on_evict)
+
+
+def _client_key(provider: str, api_key: str) -> tuple:
+    return provider, hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _build_client(provider: str, api_key: str):
+    timeout = settings.AI_PROVIDER_TIMEOUT_SECONDS
+    retries = settings.AI_PROVIDER_MAX_RETRIES
+    if provider == "openai":
+        return AsyncOpenAI(api_key=api_key, timeout=timeout, max_retries=retries)
+    if provider == "qwen":
+        # Qwen exposes an OpenAI compatible API
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=QWEN_BASE_URL,
+            timeout=timeout,
+            max_retries=retries,
+        )
+    if provider == "groq":
+        return AsyncGroq(api_key=api_key, timeout=timeout, max_retries=retries)
+    if provider == "anthropic":
+        return anthropic.AsyncAnthropic(
+            api_key=api_key, timeout=timeout, max_retries=retries
+        )
+    if provider == "gemini":
+        # The generativelanguage client takes its key per instance, unlike
+        # genai.configure which swaps a process-wide key under concurrent users.
+        return glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key})
+    raise ValueError(f"Unsupported provider: {provider}")
+
+
+def get_client(provider: str, api_key: str):
+    """
+    Returns the pooled async SDK client for a provider and API key, creating it
+    on first use.
+
+    Args:
+        provider: One of gemini, openai, anthropic, groq or qwen.
+        api_key: The user's API key. Only its hash is kept in the cache key.
+
+    Raises:
+        ValueError: If the provider is not supported.
+    """
+    key = _client_key(provider, api_key)
+    client = _clients.get(key)
+    if client is None:
+        client = _build_client(provider, api_key)
+        _clients.set(key, client)
+    return client
+
+
+async def with_deadline(call: Awaitable[T]) -> T:
+    """
+    Awaits a provider call, cancelling it once AI_REQUEST_DEADLINE_SECONDS
+    (retries included) have elapsed.
+
+    Raises:
+        TimeoutError: If the deadline is exceeded.
+    """
+    deadline = settings.AI_REQUEST_DEADLINE_SECONDS
+    if deadline <= 0:
+        return await call
+    try:
+        return await asyncio.wait_for(call, timeout=deadline)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"No response within {deadline:g}s")
+
+
+async def close_clients():
+    """
+    Closes the connection pools of every cached client, and of evicted ones
+    still waiting to be closed (application shutdown).
+    """
+    clients = _clients.values()
+    _clients.clear()
+    for task, client in list(_closing.items()):
+        task.cancel()
+        clients.append(client)
+    for client in clients:
+        await _close(client)
@@ -0,0 +1,237 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import anthropic
+import groq
+import openai
+from google.api_core import exceptions as google_exceptions
+from ..database import settings
+from .ai_clients import with_deadline
+
+T = TypeVar("T")
+
+CONNECTION_ERRORS = (
+    TimeoutError,
+    ConnectionError,
+    openai.APIConnectionError,
+    anthropic.APIConnectionError,
+    groq.APIConnectionError,
+    google_exceptions.RetryError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(
+            f"{provider} is temporarily unavailable, retry in {retry_in:.0f}s"
+        )
+        self.provider = provider
+
+
+class ProviderHealth:
+    """
+    Latency window and circuit breaker of one AI provider.
+
+    The breaker opens after `failure_threshold` consecutive provider failures
+    and rejects calls for `reset_seconds`. It then lets a single trial call
+    through (half-open): success closes it, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        failure_threshold: int,
+        reset_seconds: float,
+        window: int,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.timer = timer
+        self.latencies: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.timer() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def acquire(self):
+        """Admits a call, or raises CircuitOpenError while the breaker is open."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial_in_flight):
+            retry_in = max(self.reset_seconds - (self.timer() - self.opened_at), 0)
+            raise CircuitOpenError(self.provider, retry_in)
+        if state == "half_open":
+            self.trial_in_flight = True
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or (
+            self.consecutive_failures >= self.failure_threshold
+        ):
+            self.opened_at = self.timer()
+
+    def release(self):
+        """Ends a call that told nothing about provider health (e.g. bad API key)."""
+        self.trial_in_flight = False
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "samples": len(self.latencies),
+            "p50_seconds": self.percentile(0.5),
+            "p95_seconds": self.percentile(0.95),
+        }
+
+
+_health: Dict[str, ProviderHealth] = {}
+
+
+def health(provider: str) -> ProviderHealth:
+    if provider not in _health:
+        _health[provider] = ProviderHealth(
+            provider,
+            settings.AI_BREAKER_FAILURE_THRESHOLD,
+            settings.AI_BREAKER_RESET_SECONDS,
+            settings.AI_LATENCY_WINDOW,
+        )
+    return _health[provider]
+
+
+def reset():
+    _health.clear()
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """
+    True for errors that say the provider is unhealthy (timeouts, connection
+    errors, 5xx), as opposed to a bad request or API key. Rate limiting (429)
+    is not one: limits and quotas belong to the caller's key, and the breaker
+    is shared by every user of the provider. It still reaches the caller and
+    triggers the fallback.
+    """
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None and isinstance(error, google_exceptions.GoogleAPICallError):
+        status = error.code
+    return isinstance(status, int) and status >= 500
+
+
+@asynccontextmanager
+async def tracked(provider: str):
+    """
+    Runs the enclosed provider call under the provider's circuit breaker,
+    recording its latency on success and counting provider failures.
+
+    Raises:
+        CircuitOpenError: On entry, if the provider's breaker is open.
+    """
+    entry = health(provider)
+    entry.acquire()
+    started = entry.timer()
+    try:
+        yield
+    except Exception as e:
+        if is_provider_failure(e):
+            entry.record_failure()
+        else:
+            entry.release()
+        raise
+    except BaseException:
+        # Cancelled, e.g. the losing side of a hedged request
+        entry.release()
+        raise
+    entry.record_success(entry.timer() - started)
+
+
+async def guarded(provider: str, call: Awaitable[T]) -> T:
+    """
+    Awaits a provider call under its circuit breaker and the request deadline.
+
+    Raises:
+        CircuitOpenError: If the provider's breaker is open (`call` is dropped).
+    """
+    try:
+        async with tracked(provider):
+            return await with_deadline(call)
+    except CircuitOpenError:
+        call.close()
+        raise
+
+
+def hedge_delay(provider: str) -> float:
+    """Wait before hedging: the provider's p95 latency once enough samples exist."""
+    entry = health(provider)
+    if len(entry.latencies) >= settings.AI_HEDGE_MIN_SAMPLES:
+        return entry.percentile(0.95)
+    return settings.AI_HEDGE_DEFAULT_DELAY_SECONDS
+
+
+async def hedged(
+    provider: str,
+    primary: Callable[[], Awaitable[T]],
+    fallback: Optional[Callable[[], Awaitable[T]]] = None,
+) -> T:
+    """
+    Runs `primary`, and `fallback` as well if the primary has not answered
+    within its p95 latency. The first successful answer wins and the other call
+    is cancelled. A primary that fails (or whose breaker is open) goes straight
+    to the fallback.
+
+    Raises:
+        The primary's error when both calls fail.
+    """
+    if fallback is None:
+        return await primary()
+
+    first = asyncio.create_task(primary())
+    second = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=hedge_delay(provider))
+        if done and first.exception() is None:
+            return first.result()
+
+        second = asyncio.create_task(fallback())
+        pending = {second} if done else {first, second}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        raise first.exception()
+    finally:
+        for task in (first, second):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+def stats() -> dict:
+    return {provider: entry.snapshot() for provider, entry in _health.items()}
@@ -0,0 +1,441 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import case, delete, func, insert, literal, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Query, Session, selectinload
+from .. import models, schemas
+
+TOP_TAGS_LIMIT = 5
+
+# Trending: engagement weights and how fast their contribution halves
+LIKE_WEIGHT = 1.0
+REVIEW_WEIGHT = 1.0
+FORK_WEIGHT = 2.0
+TRENDING_HALF_LIFE = timedelta(days=7)
+# Initial epoch; rebase_trending keeps the current one in models.TrendingEpoch
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+# Event weights double every half-life after the epoch: 2^52 a year against a
+# float maximum near 2^1024, so scores would overflow about 19 years after a
+# fixed epoch. rebase_trending moves the epoch once it is this old, which keeps
+# weights and scores below 2^60.
+TRENDING_REBASE_AFTER = 52 * TRENDING_HALF_LIFE
+# PostgreSQL advisory lock serializing rebases against score increments
+TRENDING_LOCK_KEY = 0x7472656E64
+
+# Marketplace sort options and the Deck column each one orders by (descending)
+MARKETPLACE_SORTS = {
+    "likes": models.Deck.likes_count,
+    "forks": models.Deck.forks_count,
+    "rating": models.Deck.rating_avg,
+    "trending": models.Deck.trending_score,
+}
+
+
+def query_decks_with_stats(db: Session) -> Query:
+    """
+    Builds a deck listing query that carries its social statistics.
+
+    Likes, forks and ratings are the denormalized counters on Deck. Cards are
+    counted by a correlated subquery over an indexed foreign key, so counting
+    never hydrates the related rows. Each result row is (Deck, owner_username,
+    card_count).
+    """
+    card_count = (
+        select(func.count())
+        .select_from(models.Card)
+        .where(models.Card.deck_id == models.Deck.id)
+        .correlate(models.Deck)
+        .scalar_subquery()
+    )
+
+    return db.query(
+        models.Deck,
+        models.User.username.label("owner_username"),
+        card_count.label("card_count"),
+    ).join(models.User, models.Deck.owner_id == models.User.id)
+
+
+def _aware(at: datetime) -> datetime:
+    return at if at.tzinfo is not None else at.replace(tzinfo=timezone.utc)
+
+
+def _stored_epoch(db: Session) -> datetime:
+    epoch = db.scalar(select(models.TrendingEpoch.epoch))
+    return _aware(epoch) if epoch is not None else TRENDING_EPOCH
+
+
+def trending_epoch(db: Session) -> datetime:
+    """
+    The epoch trending weights are currently measured from.
+
+    On PostgreSQL this first takes a shared transaction-level advisory lock, so
+    rebase_trending cannot rescale the scores between this read and the
+    caller's commit. Increments never block each other.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock_shared(TRENDING_LOCK_KEY)))
+    return _stored_epoch(db)
+
+
+def trending_weight(
+    weight: float, epoch: datetime, at: Optional[datetime] = None
+) -> float:
+    """
+    Scales an engagement event for the trending score (forward decay).
+
+    Rather than decaying every deck's score as time passes, each event counts
+    2^(age of the event since the epoch / half-life). Comparing scores then
+    orders decks by engagement decayed with that half-life, and an event can be
+    added or withdrawn with a plain increment.
+    """
+    at = _aware(at or datetime.now(timezone.utc))
+    return weight * 2.0 ** ((at - epoch) / TRENDING_HALF_LIFE)
+
+
+def fork_trending_weight(fork: models.Deck, epoch: datetime) -> float:
+    """
+    The trending weight a fork added to its parent deck. Forks made before decks
+    recorded their creation time were counted at the initial epoch.
+    """
+    return trending_weight(FORK_WEIGHT, epoch, fork.created_at or TRENDING_EPOCH)
+
+
+def rebase_trending(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Moves the trending epoch forward once it is TRENDING_REBASE_AFTER old.
+
+    The epoch advances by whole half-lives and every trending_score is divided
+    by 2 to the same power in one UPDATE, so scores keep their order and stay
+    far from float overflow. Holds the exclusive advisory lock on PostgreSQL
+    until the caller commits. Does not commit.
+
+    Returns:
+        The number of half-lives the epoch moved, 0 if it was recent enough.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(TRENDING_LOCK_KEY)))
+    epoch = _stored_epoch(db)
+    now = _aware(now or datetime.now(timezone.utc))
+    if now - epoch < TRENDING_REBASE_AFTER:
+        return 0
+
+    steps = (now - epoch) // TRENDING_HALF_LIFE
+    # Scores are not part of any response: leave the HTTP cache stamps alone
+    db.execute(
+        update(models.Deck).values(
+            trending_score=models.Deck.trending_score * 2.0**-steps,
+            updated_at=models.Deck.updated_at,
+        )
+    )
+    db.execute(
+        _dialect_insert(db)(models.TrendingEpoch)
+        .values(id=1, epoch=epoch + steps * TRENDING_HALF_LIFE)
+        .on_conflict_do_update(
+            index_elements=["id"], set_={"epoch": epoch + steps * TRENDING_HALF_LIFE}
+        )
+    )
+    return steps
+
+
+def bump_counters(
+    db: Session,
+    deck_id: int,
+    likes: int = 0,
+    forks: int = 0,
+    rating_sum: int = 0,
+    rating_count: int = 0,
+    trending: float = 0.0,
+):
+    """
+    Atomically increments a deck's social counters in the current transaction.
+
+    A single `UPDATE decks SET likes_count = likes_count + :delta ...`, so a
+    concurrent increment is never lost, and the deck row stays locked until the
+    caller commits. Withdrawals subtract floats, so the trending score is
+    clamped at 0, and reset to exactly 0 once no like, fork or review is left.
+    Does not commit.
+
+    Returns:
+        The updated (likes_count, forks_count, rating_sum, rating_count) row,
+        or None if the deck does not exist.
+    """
+    deck = models.Deck
+    engagement = (
+        (deck.likes_count + likes)
+        + (deck.forks_count + forks)
+        + (deck.rating_count + rating_count)
+    )
+    score = deck.trending_score + trending
+    return db.execute(
+        update(deck)
+        .where(deck.id == deck_id)
+        .values(
+            likes_count=deck.likes_count + likes,
+            forks_count=deck.forks_count + forks,
+            rating_sum=deck.rating_sum + rating_sum,
+            rating_count=deck.rating_count + rating_count,
+            trending_score=case((engagement <= 0, 0.0), (score < 0, 0.0), else_=score),
+        )
+        .returning(
+            deck.likes_count, deck.forks_count, deck.rating_sum, deck.rating_count
+        )
+    ).first()
+
+
+def touch_decks(db: Session, deck_ids):
+    """
+    Marks public decks as changed (their cards were written) so HTTP caches of
+    them revalidate. Private decks are never HTTP-cached, so they are left
+    alone and their card writes (SM-2 reviews above all) take no deck row lock.
+    Does not commit.
+    """
+    deck_ids = set(deck_ids)
+    if deck_ids:
+        db.execute(
+            update(models.Deck)
+            .where(models.Deck.id.in_(deck_ids), models.Deck.is_public)
+            .values(updated_at=models.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def touch_owner_decks(db: Session, owner_id: int):
+    """
+    Marks all public decks of a user as changed, for owner details embedded in
+    deck responses (the username). Does not commit.
+    """
+    db.execute(
+        update(models.Deck)
+        .where(models.Deck.owner_id == owner_id, models.Deck.is_public)
+        .values(updated_at=models.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _dialect_insert(db: Session):
+    """The INSERT construct of the bound dialect, which supports ON CONFLICT."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def toggle_like(db: Session, deck_id: int, user_id: int):
+    """
+    Likes the deck, or unlikes it if the user already did, without a prior read.
+
+    The like is an `INSERT ... ON CONFLICT DO NOTHING RETURNING`: a row back
+    means it was added, otherwise the existing like is removed with a
+    `DELETE ... RETURNING`. Concurrent toggles are serialized by the likes
+    primary key, and the counters only move by the rows actually written.
+    Does not commit.
+
+    Returns:
+        (liked, counters) with counters as returned by bump_counters.
+    """
+    liked_at = datetime.now(timezone.utc)
+    inserted = db.execute(
+        _dialect_insert(db)(models.Like)
+        .values(user_id=user_id, deck_id=deck_id, created_at=liked_at)
+        .on_conflict_do_nothing(index_elements=["user_id", "deck_id"])
+        .returning(models.Like.created_at)
+    ).first()
+    if inserted is not None:
+        weight = trending_weight(LIKE_WEIGHT, trending_epoch(db), liked_at)
+        return True, bump_counters(db, deck_id, likes=1, trending=weight)
+
+    removed = db.execute(
+        delete(models.Like)
+        .where(models.Like.user_id == user_id, models.Like.deck_id == deck_id)
+        .returning(models.Like.created_at)
+    ).first()
+    if removed is None:
+        # A concurrent toggle removed it first: nothing left to count
+        return False, bump_counters(db, deck_id)
+    # Withdraw exactly what the like added to the trending score
+    weight = trending_weight(LIKE_WEIGHT, trending_epoch(db), removed.created_at)
+    return False, bump_counters(db, deck_id, likes=-1, trending=-weight)
+
+
+def upsert_review(
+    db: Session, deck_id: int, user_id: int, rating: int, comment: Optional[str]
+):
+    """
+    Creates the user's review of a deck, or updates it if one exists.
+
+    A new review is one `INSERT ... ON CONFLICT DO NOTHING RETURNING` on the
+    (user_id, deck_id) unique constraint. On conflict the existing review is
+    locked (`SELECT ... FOR UPDATE`) to read the rating it replaces, since
+    RETURNING only sees the new row, and the rating sum moves by the
+    difference. Does not commit.
+
+    Returns:
+        (review, counters) with counters as returned by bump_counters.
+    """
+    review = db.scalar(
+        _dialect_insert(db)(models.Review)
+        .values(user_id=user_id, deck_id=deck_id, rating=rating, comment=comment)
+        .on_conflict_do_nothing(index_elements=["user_id", "deck_id"])
+        .returning(models.Review)
+    )
+    if review is not None:
+        weight = trending_weight(REVIEW_WEIGHT, trending_epoch(db))
+        counters = bump_counters(
+            db, deck_id, rating_sum=rating, rating_count=1, trending=weight
+        )
+        return review, counters
+
+    review_id, previous = db.execute(
+        select(models.Review.id, models.Review.rating)
+        .where(models.Review.user_id == user_id, models.Review.deck_id == deck_id)
+        .with_for_update()
+    ).one()
+    review = db.scalar(
+        update(models.Review)
+        .where(models.Review.id == review_id)
+        .values(rating=rating, comment=comment)
+        .returning(models.Review),
+        execution_options={"populate_existing": True},
+    )
+    return review, bump_counters(db, deck_id, rating_sum=rating - previous)
+
+
+def copy_cards(db: Session, target_deck_id: int, *criteria, keep_roadmap_link=False):
+    """
+    Copies the cards matching `criteria` into a deck with a single
+    INSERT ... SELECT, so no card is loaded into Python whatever the deck size.
+    SM-2 state of the copies starts fresh. Does not commit.
+
+    Returns:
+        Number of cards copied.
+    """
+    columns = [
+        "title",
+        "code_snippet",
+        "explanation",
+        "language",
+        "tags",
+        "code_terms",
+    ]
+    if keep_roadmap_link:
+        columns += ["roadmap_id", "roadmap_title"]
+
+    source = (
+        select(
+            literal(target_deck_id),
+            *[getattr(models.Card, column) for column in columns],
+            literal(2.5),
+            literal(0),
+            literal(0),
+        )
+        .where(*criteria)
+        .order_by(models.Card.id)
+    )
+    result = db.execute(
+        insert(models.Card).from_select(
+            ["deck_id", *columns, "ease_factor", "interval", "repetitions"], source
+        )
+    )
+    return result.rowcount
+
+
+def get_deck_with_stats(db: Session, deck_id: int):
+    """Fetches one query_decks_with_stats row with its cards loaded, or None."""
+    return (
+        query_decks_with_stats(db)
+        .options(selectinload(models.Deck.cards))
+        .filter(models.Deck.id == deck_id)
+        .first()
+    )
+
+
+def _apply_stats(response: schemas.DeckSummaryResponse, row):
+    response.owner_username = row.owner_username
+    response.card_count = row.card_count
+    return response
+
+
+def to_deck_response(row) -> schemas.DeckResponse:
+    """Populates a full DeckResponse (cards included) from a deck row."""
+    response = schemas.DeckResponse.model_validate(row.Deck)
+    _apply_stats(response, row)
+    languages, top_tags = _card_facets(row.Deck.cards)
+    response.languages = languages
+    response.top_tags = top_tags
+    return response
+
+
+def to_deck_summaries(db: Session, rows) -> List[schemas.DeckSummaryResponse]:
+    """
+    Populates DeckSummaryResponses for a page of query_decks_with_stats rows.
+
+    Languages and top tags for the whole page are aggregated by two grouped
+    queries, reading only the language and tag columns of the cards.
+    """
+    deck_ids = [row.Deck.id for row in rows]
+    languages = _languages_by_deck(db, deck_ids)
+    top_tags = _top_tags_by_deck(db, deck_ids)
+
+    summaries = []
+    for row in rows:
+        summary = schemas.DeckSummaryResponse.model_validate(row.Deck)
+        _apply_stats(summary, row)
+        summary.languages = languages.get(row.Deck.id, [])
+        summary.top_tags = top_tags.get(row.Deck.id, [])
+        summaries.append(summary)
+    return summaries
+
+
+def _card_facets(cards):
+    language_counts: Dict[str, int] = defaultdict(int)
+    tag_counts: Dict[str, int] = defaultdict(int)
+    for card in cards:
+        language_counts[card.language] += 1
+        for tag in card.tags or []:
+            tag_counts[tag] += 1
+    return _most_common(language_counts), _most_common(tag_counts)[:TOP_TAGS_LIMIT]
+
+
+def _most_common(counts: Dict[str, int]) -> List[str]:
+    return [key for key, _ in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+
+def _languages_by_deck(db: Session, deck_ids: List[int]) -> Dict[int, List[str]]:
+    if not deck_ids:
+        return {}
+
+    counts: Dict[int, Dict[str, int]] = defaultdict(dict)
+    stmt = (
+        select(models.Card.deck_id, models.Card.language, func.count())
+        .where(models.Card.deck_id.in_(deck_ids))
+        .group_by(models.Card.deck_id, models.Card.language)
+    )
+    for deck_id, language, count in db.execute(stmt):
+        counts[deck_id][language] = count
+    return {deck_id: _most_common(c) for deck_id, c in counts.items()}
+
+
+def _top_tags_by_deck(db: Session, deck_ids: List[int]) -> Dict[int, List[str]]:
+    if not deck_ids:
+        return {}
+
+    # Unnest the JSON tag arrays server-side so only (deck, tag, count) rows come back
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        tag = func.jsonb_array_elements_text(models.Card.tags).table_valued("value")
+    else:
+        tag = func.json_each(models.Card.tags).table_valued("value")
+
+    counts: Dict[int, Dict[str, int]] = defaultdict(dict)
+    stmt = (
+        select(models.Card.deck_id, tag.c.value, func.count())
+        .select_from(models.Card)
+        .join(tag, true())
+        .where(models.Card.deck_id.in_(deck_ids))
+        .group_by(models.Card.deck_id, tag.c.value)
+    )
+    for deck_id, value, count in db.execute(stmt):
+        counts[deck_id][value] = count
+    return {
+        deck_id: _most_common(c)[:TOP_TAGS_LIMIT] for deck_id, c in counts.items()
+    }
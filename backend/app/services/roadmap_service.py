@@ -1,7 +1,10 @@
 import json
 import os
+from collections import defaultdict
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
-from .. import models, schemas
+from .. import http_cache, models, schemas
+from . import deck_service, search_index
 
 
 def ingest_roadmaps(db: Session):
@@ -26,6 +29,14 @@ def ingest_roadmaps(db: Session):
                 )
 
                 if db_roadmap:
+                    if db_roadmap.content != data:
+                        # Node structure may have changed: drop materialized mastery
+                        db.execute(
+                            delete(models.RoadmapNodeMastery).where(
+                                models.RoadmapNodeMastery.roadmap_id == roadmap_id
+                            )
+                        )
+                    _starter_deck_titles.pop(roadmap_id, None)
                     db_roadmap.title = data["title"]
                     db_roadmap.version = data["version"]
                     db_roadmap.description = data.get("description")
@@ -40,49 +51,315 @@ def ingest_roadmaps(db: Session):
                     )
                     db.add(db_roadmap)
     db.commit()
+    # Only this process's cached bodies are dropped: other API workers keep
+    # serving the previous roadmaps for up to RESPONSE_CACHE_TTL_SECONDS
+    http_cache.bodies.clear()
 
 
-def get_node_mastery(db: Session, user_id: int, roadmap_id: str):
-    roadmap = db.query(models.Roadmap).filter(models.Roadmap.id == roadmap_id).first()
-    if not roadmap:
-        return None
+MASTERY_INTERVAL_DAYS = 21
+
 
-    # Fetch all user cards
+def _build_tag_index(cards):
+    """
+    Builds an inverted tag -> card bitset index over (tags, interval) rows.
+
+    Bit i of a posting list is set when card i carries the tag, so the cards
+    holding ALL tags of a node are the AND of the node's posting lists.
+    Returns (postings, all_cards_mask, mastered_mask).
+    """
+    postings = {}
+    mastered_mask = 0
+    for position, (tags, interval) in enumerate(cards):
+        bit = 1 << position
+        for tag in set(tags or []):
+            postings[tag] = postings.get(tag, 0) | bit
+        if interval >= MASTERY_INTERVAL_DAYS:
+            mastered_mask |= bit
+    return postings, (1 << len(cards)) - 1, mastered_mask
+
+
+def _roadmap_nodes(roadmap: models.Roadmap):
+    """Flattens a roadmap tree into [(node_id, tags)] in depth-first order."""
+    nodes = []
+
+    def traverse(node):
+        nodes.append((node["id"], frozenset(node.get("tags", []))))
+        for child in node.get("children", []):
+            traverse(child)
+
+    traverse(roadmap.content["root"])
+    return nodes
+
+
+def _to_node_mastery(node_id: str, total: int, mastered: int):
+    return schemas.NodeMastery(
+        node_id=node_id,
+        mastery_percentage=(mastered / total * 100) if total > 0 else 0,
+        total_cards=total,
+        mastered_cards=mastered,
+    )
+
+
+def _compute_node_mastery(db: Session, user_id: int, roadmap: models.Roadmap):
+    """Computes the mastery rows of a user for one roadmap from the user's cards."""
+    # Fetch only the columns mastery depends on for all user cards
     user_cards = (
-        db.query(models.Card)
+        db.query(models.Card.tags, models.Card.interval)
         .join(models.Deck)
         .filter(models.Deck.owner_id == user_id)
         .all()
     )
+    postings, all_cards, mastered_cards = _build_tag_index(user_cards)
 
-    results = []
+    rows = []
+    for position, (node_id, node_tags) in enumerate(_roadmap_nodes(roadmap)):
+        # A card matches if it has ALL the tags of the node
+        matching = all_cards
+        for tag in node_tags:
+            matching &= postings.get(tag, 0)
+            if not matching:
+                break
 
-    def traverse(node):
-        node_id = node["id"]
-        node_tags = set(node.get("tags", []))
+        rows.append(
+            {
+                "user_id": user_id,
+                "roadmap_id": roadmap.id,
+                "node_id": node_id,
+                "position": position,
+                "total_cards": matching.bit_count(),
+                "mastered_cards": (matching & mastered_cards).bit_count(),
+            }
+        )
+    return rows
 
-        # A card matches if it has ALL the tags of the node
-        matching_cards = [c for c in user_cards if node_tags.issubset(set(c.tags))]
 
-        total = len(matching_cards)
-        mastered = len([c for c in matching_cards if c.interval >= 21])
+def rebuild_node_mastery(db: Session, user_id: int, roadmap: models.Roadmap):
+    """
+    Recomputes the materialized mastery rows of a user for one roadmap from the
+    user's cards, replacing any existing rows. Does not commit.
+    """
+    rows = _compute_node_mastery(db, user_id, roadmap)
+    db.execute(
+        delete(models.RoadmapNodeMastery).where(
+            models.RoadmapNodeMastery.user_id == user_id,
+            models.RoadmapNodeMastery.roadmap_id == roadmap.id,
+        )
+    )
+    db.execute(insert(models.RoadmapNodeMastery), rows)
+    return rows
+
+
+def get_node_mastery(db: Session, user_id: int, roadmap_id: str):
+    rows = (
+        db.query(models.RoadmapNodeMastery)
+        .filter(
+            models.RoadmapNodeMastery.user_id == user_id,
+            models.RoadmapNodeMastery.roadmap_id == roadmap_id,
+        )
+        .order_by(models.RoadmapNodeMastery.position)
+        .all()
+    )
+    if rows:
+        return [
+            _to_node_mastery(row.node_id, row.total_cards, row.mastered_cards)
+            for row in rows
+        ]
+
+    # First read for this user and roadmap: materialize it
+    roadmap = db.query(models.Roadmap).filter(models.Roadmap.id == roadmap_id).first()
+    if not roadmap:
+        return None
+
+    # Concurrent first reads compute the same rows; whichever inserts last
+    # skips the rows already there instead of failing on the primary key
+    built = _compute_node_mastery(db, user_id, roadmap)
+    db.execute(
+        deck_service._dialect_insert(db)(models.RoadmapNodeMastery)
+        .values(built)
+        .on_conflict_do_nothing(index_elements=["user_id", "roadmap_id", "node_id"])
+    )
+    db.commit()
+    return [
+        _to_node_mastery(row["node_id"], row["total_cards"], row["mastered_cards"])
+        for row in built
+    ]
+
+
+def _same_contribution(before, after) -> bool:
+    """Whether a card change leaves every node's counts as they were."""
+    if before is None or after is None:
+        return False
+    (tags_before, interval_before), (tags_after, interval_after) = before, after
+    return set(tags_before or []) == set(tags_after or []) and (
+        interval_before >= MASTERY_INTERVAL_DAYS
+    ) == (interval_after >= MASTERY_INTERVAL_DAYS)
+
+
+def apply_card_changes(db: Session, user_id: int, changes):
+    """
+    Incrementally maintains a user's materialized mastery after card changes.
+
+    Each change is a (before, after) pair of (tags, interval) tuples describing
+    one card, with None for a card that did not exist before (created) or no
+    longer exists after (deleted). Node deltas are summed across all changes and
+    applied with one UPDATE per distinct delta. Does not commit.
+    """
+    if all(_same_contribution(before, after) for before, after in changes):
+        return
+
+    roadmap_ids = [
+        roadmap_id
+        for (roadmap_id,) in db.query(models.RoadmapNodeMastery.roadmap_id)
+        .filter(models.RoadmapNodeMastery.user_id == user_id)
+        .distinct()
+    ]
+    if not roadmap_ids:
+        return
+
+    def contribution(state, node_tags):
+        if state is None:
+            return 0, 0
+        tags, interval = state
+        if not node_tags.issubset(tags or []):
+            return 0, 0
+        return 1, 1 if interval >= MASTERY_INTERVAL_DAYS else 0
 
-        percentage = (mastered / total * 100) if total > 0 else 0
+    roadmaps = db.query(models.Roadmap).filter(models.Roadmap.id.in_(roadmap_ids))
+    for roadmap in roadmaps:
+        node_ids_by_delta = defaultdict(list)
+        for node_id, node_tags in _roadmap_nodes(roadmap):
+            delta_total, delta_mastered = 0, 0
+            for before, after in changes:
+                total_after, mastered_after = contribution(after, node_tags)
+                total_before, mastered_before = contribution(before, node_tags)
+                delta_total += total_after - total_before
+                delta_mastered += mastered_after - mastered_before
+            if delta_total or delta_mastered:
+                node_ids_by_delta[(delta_total, delta_mastered)].append(node_id)
 
-        results.append(
-            schemas.NodeMastery(
-                node_id=node_id,
-                mastery_percentage=percentage,
-                total_cards=total,
-                mastered_cards=mastered,
+        for (delta_total, delta_mastered), node_ids in node_ids_by_delta.items():
+            db.execute(
+                update(models.RoadmapNodeMastery)
+                .where(
+                    models.RoadmapNodeMastery.user_id == user_id,
+                    models.RoadmapNodeMastery.roadmap_id == roadmap.id,
+                    models.RoadmapNodeMastery.node_id.in_(node_ids),
+                )
+                .values(
+                    total_cards=models.RoadmapNodeMastery.total_cards + delta_total,
+                    mastered_cards=models.RoadmapNodeMastery.mastered_cards
+                    + delta_mastered,
+                )
             )
+
+
+def invalidate_node_mastery(db: Session, user_id: int):
+    """
+    Drops a user's materialized mastery so it is rebuilt on the next read.
+    Used after bulk card operations (forks, starter decks, deck deletion).
+    Does not commit.
+    """
+    db.execute(
+        delete(models.RoadmapNodeMastery).where(
+            models.RoadmapNodeMastery.user_id == user_id
         )
+    )
 
-        for child in node.get("children", []):
-            traverse(child)
 
-    traverse(roadmap.content["root"])
-    return results
+def rebuild_all_node_mastery(db: Session):
+    """
+    Rebuilds the materialized mastery of every (user, roadmap) pair that is
+    materialized or subscribed, fixing any drift. Commits once per pair.
+    """
+    pairs = set(
+        db.query(
+            models.RoadmapNodeMastery.user_id, models.RoadmapNodeMastery.roadmap_id
+        ).distinct()
+    )
+    pairs.update(
+        db.query(
+            models.RoadmapSubscription.user_id, models.RoadmapSubscription.roadmap_id
+        )
+    )
+
+    roadmaps = {roadmap.id: roadmap for roadmap in db.query(models.Roadmap)}
+    for user_id, roadmap_id in sorted(pairs):
+        rebuild_node_mastery(db, user_id, roadmaps[roadmap_id])
+        db.commit()
+    return len(pairs)
+
+
+ADMIN_EMAIL = "admin@example.com"
+
+# Process-wide lookups for starter-card seeding; see clear_seeding_cache
+_admin_user_id = None
+_starter_deck_titles = {}
+
+
+def clear_seeding_cache():
+    """Forgets the cached admin user id and starter deck titles."""
+    global _admin_user_id
+    _admin_user_id = None
+    _starter_deck_titles.clear()
+
+
+def _get_admin_user_id(db: Session):
+    global _admin_user_id
+    if _admin_user_id is None:
+        _admin_user_id = (
+            db.query(models.User.id).filter(models.User.email == ADMIN_EMAIL).scalar()
+        )
+    return _admin_user_id
+
+
+def _get_starter_deck_title(db: Session, roadmap_id: str) -> str:
+    if roadmap_id not in _starter_deck_titles:
+        title = (
+            db.query(models.Roadmap.title)
+            .filter(models.Roadmap.id == roadmap_id)
+            .scalar()
+        )
+        _starter_deck_titles[roadmap_id] = f"Starter: {title or roadmap_id}"
+    return _starter_deck_titles[roadmap_id]
+
+
+def _seed_starter_cards(db: Session, user_id: int, roadmap_id: str):
+    """
+    Copies the admin's canonical cards for a roadmap into a new starter deck
+    with a single INSERT ... SELECT. The deck is discarded when the roadmap has
+    no canonical cards. Does not commit.
+
+    Returns:
+        The id of the starter deck, or None when none was created.
+    """
+    admin_user_id = _get_admin_user_id(db)
+    if admin_user_id is None:
+        return None
+
+    # Create a new deck for the user
+    new_deck = models.Deck(
+        title=_get_starter_deck_title(db, roadmap_id),
+        description=f"Starter cards for the {roadmap_id} roadmap.",
+        owner_id=user_id,
+        is_public=False,
+    )
+    db.add(new_deck)
+    db.flush()  # Get new_deck.id
+
+    copied = deck_service.copy_cards(
+        db,
+        new_deck.id,
+        models.Card.roadmap_id == roadmap_id,
+        models.Card.deck_id.in_(
+            select(models.Deck.id).where(models.Deck.owner_id == admin_user_id)
+        ),
+        keep_roadmap_link=True,
+    )
+    if not copied:
+        db.delete(new_deck)
+        return None
+    invalidate_node_mastery(db, user_id)
+    return new_deck.id
 
 
 def subscribe_user(
@@ -103,60 +380,14 @@ def subscribe_user(
         )
         db.add(subscription)
 
+        starter_deck_id = None
         if include_default_cards:
-            # Find public cards associated with this roadmap owned by admin
-            admin_user = (
-                db.query(models.User)
-                .filter(models.User.email == "admin@example.com")
-                .first()
-            )
-
-            if admin_user:
-                canonical_cards = (
-                    db.query(models.Card)
-                    .join(models.Deck)
-                    .filter(
-                        models.Card.roadmap_id == roadmap_id,
-                        models.Deck.owner_id == admin_user.id,
-                    )
-                    .all()
-                )
-
-                if canonical_cards:
-                    roadmap_obj = (
-                        db.query(models.Roadmap)
-                        .filter(models.Roadmap.id == roadmap_id)
-                        .first()
-                    )
-                    deck_title = (
-                        f"Starter: {roadmap_obj.title if roadmap_obj else roadmap_id}"
-                    )
-
-                    # Create a new deck for the user
-                    new_deck = models.Deck(
-                        title=deck_title,
-                        description=f"Starter cards for the {roadmap_id} roadmap.",
-                        owner_id=user_id,
-                        is_public=False,
-                    )
-                    db.add(new_deck)
-                    db.flush()  # Get new_deck.id
-
-                    for card in canonical_cards:
-                        new_card = models.Card(
-                            deck_id=new_deck.id,
-                            title=card.title,
-                            code_snippet=card.code_snippet,
-                            explanation=card.explanation,
-                            language=card.language,
-                            tags=card.tags,
-                            roadmap_id=card.roadmap_id,
-                            roadmap_title=card.roadmap_title,
-                        )
-                        db.add(new_card)
+            starter_deck_id = _seed_starter_cards(db, user_id, roadmap_id)
 
         db.commit()
         db.refresh(subscription)
+        if starter_deck_id is not None:
+            search_index.index_deck(db, starter_deck_id)
 
     return subscription
 
@@ -0,0 +1,304 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from .. import models
+from ..database import settings
+
+# Field weights, title > tags > explanation > code (as the full-text index)
+FIELD_WEIGHTS = (("title", 4.0), ("tags", 3.0), ("explanation", 2.0), ("code", 1.0))
+
+# Score multipliers for how a query term matched a token
+EXACT, PREFIX, FUZZY = 1.0, 0.6, 0.4
+
+# Vocabulary tokens a short prefix may expand to (bounds type-ahead cost)
+MAX_PREFIX_EXPANSIONS = 200
+
+# Fuzzy matching is limited to one edit, on terms long enough to be meaningful
+FUZZY_MIN_LENGTH = 4
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def tag_tokens(tags: Optional[Iterable[str]]) -> List[str]:
+    """Whole tags (`lang:py`) plus their words, so both forms can be searched."""
+    tokens = []
+    for tag in tags or ():
+        tokens.append(tag.lower())
+        tokens.extend(tokenize(tag))
+    return tokens
+
+
+def _deletes(token: str) -> Set[str]:
+    return {token[:i] + token[i + 1 :] for i in range(len(token))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion or substitution."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1 :] == b[i + 1 :]
+    return a[i:] == b[i + 1 :]
+
+
+class _OwnerIndex:
+    """Postings, sorted vocabulary and delete-neighbourhoods of one user's cards."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.vocabulary: List[str] = []
+        self.neighbours: Dict[str, Set[str]] = defaultdict(set)
+
+    def add(self, card_id: int, weights: Dict[str, float]):
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+                for variant in _deletes(token):
+                    self.neighbours[variant].add(token)
+            self.postings[token][card_id] = weight
+
+    def remove(self, card_id: int, tokens: Iterable[str]):
+        for token in tokens:
+            postings = self.postings[token]
+            postings.pop(card_id, None)
+            if not postings:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+                for variant in _deletes(token):
+                    self.neighbours[variant].discard(token)
+                    if not self.neighbours[variant]:
+                        del self.neighbours[variant]
+
+    def matches(self, term: str, prefix: bool, fuzzy: bool) -> Dict[str, float]:
+        """Tokens a query term matches, with the multiplier of each match kind."""
+        matches: Dict[str, float] = {}
+        if prefix:
+            start = bisect.bisect_left(self.vocabulary, term)
+            end = min(start + MAX_PREFIX_EXPANSIONS, len(self.vocabulary))
+            for index in range(start, end):
+                token = self.vocabulary[index]
+                if not token.startswith(term):
+                    break
+                matches[token] = PREFIX
+        if fuzzy and len(term) >= FUZZY_MIN_LENGTH:
+            candidates = set(self.neighbours.get(term, ()))
+            for variant in _deletes(term) | {term}:
+                candidates.update(self.neighbours.get(variant, ()))
+                if variant in self.postings:
+                    candidates.add(variant)
+            for token in candidates:
+                if _within_one_edit(term, token):
+                    matches.setdefault(token, FUZZY)
+        if term in self.postings:
+            matches[term] = EXACT
+        return matches
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over card titles, tags, explanations and code.
+
+    Each user has their own postings, mapping each token to the cards containing
+    it with a field-weighted score. A sorted vocabulary serves prefix lookups by
+    bisection and a delete-neighbourhood map (symmetric delete) serves one-edit
+    fuzzy lookups, so a query costs dictionary probes over the searching user's
+    tokens only. Only card ids are returned: the database stays the source of
+    truth for card contents. Thread-safe, since sync routes update it from the
+    threadpool.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._owners: Dict[int, _OwnerIndex] = {}
+        self._card_tokens: Dict[int, Set[str]] = {}
+        self._card_owner: Dict[int, Tuple[int, int]] = {}
+        self._deck_cards: Dict[int, Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._card_tokens)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def add(self, card_id: int, owner_id: int, deck_id: int, fields: dict):
+        """Indexes (or re-indexes) a card from its title/tags/explanation/code."""
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS:
+            value = fields.get(field)
+            tokens = tag_tokens(value) if field == "tags" else tokenize(value)
+            for token in set(tokens):
+                weights[token] += weight
+
+        with self._lock:
+            self._remove(card_id)
+            if owner_id not in self._owners:
+                self._owners[owner_id] = _OwnerIndex()
+            self._owners[owner_id].add(card_id, weights)
+            self._card_tokens[card_id] = set(weights)
+            self._card_owner[card_id] = (owner_id, deck_id)
+            self._deck_cards[deck_id].add(card_id)
+
+    def remove(self, card_id: int):
+        with self._lock:
+            self._remove(card_id)
+
+    def _remove(self, card_id: int):
+        if card_id not in self._card_owner:
+            return
+        owner_id, deck_id = self._card_owner.pop(card_id)
+        owner = self._owners[owner_id]
+        owner.remove(card_id, self._card_tokens.pop(card_id))
+        if not owner.postings:
+            del self._owners[owner_id]
+        deck_cards = self._deck_cards[deck_id]
+        deck_cards.discard(card_id)
+        if not deck_cards:
+            del self._deck_cards[deck_id]
+
+    def remove_deck(self, deck_id: int):
+        with self._lock:
+            for card_id in list(self._deck_cards.get(deck_id, ())):
+                self._remove(card_id)
+
+    def replace(self, other: "SearchIndex"):
+        """Swaps in the contents of a freshly built index."""
+        with self._lock, other._lock:
+            self._owners = other._owners
+            self._card_tokens = other._card_tokens
+            self._card_owner = other._card_owner
+            self._deck_cards = other._deck_cards
+
+    def search(
+        self,
+        owner_id: int,
+        query: str,
+        limit: int = 10,
+        deck_id: Optional[int] = None,
+        fuzzy: bool = True,
+    ) -> List[Tuple[int, float]]:
+        """
+        Type-ahead search over one user's cards.
+
+        Every query term must match (exactly or, with `fuzzy`, within one edit).
+        The last term also matches as a prefix, since it may still be being typed.
+
+        Returns:
+            Up to `limit` (card_id, score) pairs, best first.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            owner = self._owners.get(owner_id)
+            if owner is None:
+                return []
+            in_deck = None if deck_id is None else self._deck_cards.get(deck_id, set())
+            scores: Optional[Dict[int, float]] = None
+            for position, term in enumerate(terms):
+                is_last = position == len(terms) - 1
+                term_scores: Dict[int, float] = defaultdict(float)
+                for token, factor in owner.matches(term, is_last, fuzzy).items():
+                    for card_id, weight in owner.postings[token].items():
+                        if in_deck is not None and card_id not in in_deck:
+                            continue
+                        term_scores[card_id] = max(
+                            term_scores[card_id], weight * factor
+                        )
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {
+                        card_id: score + term_scores[card_id]
+                        for card_id, score in scores.items()
+                        if card_id in term_scores
+                    }
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda hit: (-hit[1], hit[0]))
+        return ranked[:limit]
+
+
+card_index = SearchIndex()
+
+
+def enabled() -> bool:
+    return settings.SEARCH_INDEX_ENABLED
+
+
+def _card_fields(card) -> dict:
+    return {
+        "title": card.title,
+        "tags": card.tags,
+        "explanation": card.explanation,
+        "code": card.code_snippet,
+    }
+
+
+def index_card(card: models.Card, owner_id: int):
+    if enabled():
+        card_index.add(card.id, owner_id, card.deck_id, _card_fields(card))
+
+
+def remove_card(card_id: int):
+    if enabled():
+        card_index.remove(card_id)
+
+
+def _card_rows(db: Session, *criteria):
+    return (
+        db.query(
+            models.Card.id,
+            models.Card.deck_id,
+            models.Card.title,
+            models.Card.tags,
+            models.Card.explanation,
+            models.Card.code_snippet,
+            models.Deck.owner_id,
+        )
+        .join(models.Deck)
+        .filter(*criteria)
+        .execution_options(yield_per=1000)
+    )
+
+
+def index_deck(db: Session, deck_id: int):
+    """(Re-)indexes every card of a deck, e.g. after a bulk copy."""
+    if enabled():
+        for row in _card_rows(db, models.Card.deck_id == deck_id):
+            card_index.add(row.id, row.owner_id, row.deck_id, _card_fields(row))
+
+
+def remove_deck(deck_id: int):
+    if enabled():
+        card_index.remove_deck(deck_id)
+
+
+def rebuild(db: Session) -> int:
+    """
+    Builds a fresh index from the database and swaps it in, so lookups keep
+    being served from the old one meanwhile. Returns the number of cards.
+    """
+    fresh = SearchIndex()
+    for row in _card_rows(db):
+        fresh.add(row.id, row.owner_id, row.deck_id, _card_fields(row))
+    card_index.replace(fresh)
+    return len(fresh)
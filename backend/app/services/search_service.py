@@ -0,0 +1,113 @@
+from typing import List
+from sqlalchemy import case, cast, func, literal_column, or_, select, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from .. import models
+
+DEFAULT_TOP_K = 20
+MAX_TOP_K = 100
+
+# Share of the final score given to title trigram similarity; the rest is the
+# weighted full-text rank.
+TRIGRAM_WEIGHT = 0.3
+
+# Generated column created by models.CARD_SEARCH_DDL (PostgreSQL only)
+search_vector = literal_column("cards.search_vector")
+
+
+def _pg_ranked(query, term: str):
+    # Stemmed words match title/explanation, unstemmed ones tags and code
+    ts_query = func.websearch_to_tsquery("english", term).op("||")(
+        func.websearch_to_tsquery("simple", term)
+    )
+    similarity = func.similarity(models.Card.title, term)
+    rank = func.ts_rank(search_vector, ts_query)
+    score = (1 - TRIGRAM_WEIGHT) * rank + TRIGRAM_WEIGHT * similarity
+    # Both predicates are GIN-indexed, so the planner can BitmapOr them
+    candidates = or_(search_vector.op("@@")(ts_query), models.Card.title.op("%")(term))
+    return query.filter(candidates), score
+
+
+def _fallback_ranked(query, term: str):
+    pattern = f"%{term}%"
+    fields = [
+        (models.Card.title, 1.0),
+        (cast(models.Card.tags, String), 0.4),
+        (models.Card.explanation, 0.2),
+        (models.Card.code_snippet, 0.1),
+    ]
+    score = sum(
+        case((column.ilike(pattern), weight), else_=0.0) for column, weight in fields
+    )
+    return query.filter(or_(*[column.ilike(pattern) for column, _ in fields])), score
+
+
+def ranked_search(query, term: str, k: int = DEFAULT_TOP_K):
+    """
+    Runs a relevance-ranked card search and returns the top `k` hits.
+
+    On PostgreSQL, candidates match the weighted `search_vector` (title > tags >
+    explanation > code) or are trigram-similar on the title. Both tests are
+    served by GIN indexes. The score blends ts_rank with title similarity. Other
+    dialects use weighted substring matches instead.
+
+    Args:
+        query: ORM query over Card, already scoped to the cards the user may see.
+        term: Free-text search input (websearch syntax: quotes, OR, -exclusion).
+        k: Maximum number of hits.
+
+    Returns:
+        List of (Card, score) tuples, best first.
+    """
+    if query.session.bind.dialect.name == "postgresql":
+        query, score = _pg_ranked(query, term)
+    else:
+        query, score = _fallback_ranked(query, term)
+
+    score = score.label("score")
+    return (
+        query.add_columns(score)
+        .order_by(score.desc(), models.Card.id)
+        .limit(k)
+        .all()
+    )
+
+
+def _has_code_term(dialect: str, term: str):
+    if dialect == "postgresql":
+        return models.Card.code_terms.op("?")(term)
+    value = func.json_each(models.Card.code_terms).table_valued("value")
+    return select(1).select_from(value).where(value.c.value == term).exists()
+
+
+def code_search(query, terms: List[str], k: int = DEFAULT_TOP_K):
+    """
+    Ranks cards by how many code terms (see `code_tokens.query_terms`) their
+    snippet contains, so symbols like `@app.get` or `async with` match exactly
+    instead of being split apart by the text analyzers.
+
+    On PostgreSQL, candidates are found with one `?|` probe of the GIN index on
+    `code_terms`; other dialects probe the unnested array.
+
+    Returns:
+        List of (Card, score) tuples, best first; the score is the share of
+        terms matched.
+    """
+    if not terms:
+        return []
+    dialect = query.session.bind.dialect.name
+    if dialect == "postgresql":
+        candidates = models.Card.code_terms.op("?|")(cast(terms, ARRAY(Text)))
+    else:
+        candidates = or_(*[_has_code_term(dialect, term) for term in terms])
+
+    matched = sum(
+        case((_has_code_term(dialect, term), 1.0), else_=0.0) for term in terms
+    )
+    score = (matched / len(terms)).label("score")
+    return (
+        query.filter(candidates)
+        .add_columns(score)
+        .order_by(score.desc(), models.Card.id)
+        .limit(k)
+        .all()
+    )
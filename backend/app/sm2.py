@@ -1,8 +1,14 @@
 from datetime import datetime, timedelta, timezone
+from typing import Optional
+import numpy as np
 
 
 def calculate_sm2(
-    quality: int, repetitions: int, previous_interval: int, previous_ease_factor: float
+    quality: int,
+    repetitions: int,
+    previous_interval: int,
+    previous_ease_factor: float,
+    reviewed_at: Optional[datetime] = None,
 ):
     """
     SM-2 Algorithm implementation.
@@ -16,6 +22,7 @@ def calculate_sm2(
         repetitions (int): number of times this card has been successfully remembered
         previous_interval (int): previous interval in days
         previous_ease_factor (float): previous ease factor (difficulty metric)
+        reviewed_at (datetime, optional): when the review happened; defaults to now
 
     Returns:
         tuple: (new_repetitions, new_interval, new_ease_factor, next_review_date)
@@ -40,6 +47,67 @@ def calculate_sm2(
     if new_ease_factor < 1.3:
         new_ease_factor = 1.3
 
-    next_review_date = datetime.now(timezone.utc) + timedelta(days=new_interval)
+    if reviewed_at is None:
+        reviewed_at = datetime.now(timezone.utc)
+    next_review_date = reviewed_at + timedelta(days=new_interval)
 
     return new_repetitions, new_interval, new_ease_factor, next_review_date
+
+
+def calculate_sm2_batch(
+    quality,
+    repetitions,
+    previous_interval,
+    previous_ease_factor,
+    reference_time: Optional[datetime] = None,
+):
+    """
+    Vectorized SM-2 for bulk rescheduling (batch ingestion, replays, schedule shifts).
+
+    Applies exactly the same transitions as calculate_sm2 element-wise over arrays,
+    using the same float64 arithmetic and round-half-to-even rounding, so results
+    are identical to calling the scalar function card by card.
+
+    Args:
+        quality (array-like of int): 0-5 recall quality per card
+        repetitions (array-like of int): successful repetitions per card
+        previous_interval (array-like of int): previous intervals in days
+        previous_ease_factor (array-like of float): previous ease factors
+        reference_time (datetime, optional): single review time for the whole
+            batch; defaults to now
+
+    Returns:
+        tuple: (new_repetitions, new_intervals, new_ease_factors, next_review_dates)
+        as NumPy arrays; next review dates are UTC `datetime64[us]` values.
+    """
+    quality = np.asarray(quality, dtype=np.int64)
+    repetitions = np.asarray(repetitions, dtype=np.int64)
+    previous_interval = np.asarray(previous_interval, dtype=np.int64)
+    previous_ease_factor = np.asarray(previous_ease_factor, dtype=np.float64)
+
+    passed = quality >= 3
+    grown_interval = np.rint(previous_interval * previous_ease_factor).astype(np.int64)
+    new_interval = np.where(
+        passed,
+        np.where(repetitions == 0, 1, np.where(repetitions == 1, 6, grown_interval)),
+        1,
+    )
+    new_repetitions = np.where(passed, repetitions + 1, 0)
+
+    lapse = 5 - quality
+    new_ease_factor = np.where(
+        passed,
+        previous_ease_factor + (0.1 - lapse * (0.08 + lapse * 0.02)),
+        previous_ease_factor,
+    )
+    new_ease_factor = np.maximum(new_ease_factor, 1.3)
+
+    if reference_time is None:
+        reference_time = datetime.now(timezone.utc)
+    if reference_time.tzinfo is not None:
+        reference_time = reference_time.astimezone(timezone.utc).replace(tzinfo=None)
+    next_review_dates = np.datetime64(reference_time, "us") + new_interval.astype(
+        "timedelta64[D]"
+    )
+
+    return new_repetitions, new_interval, new_ease_factor, next_review_dates
@@ -0,0 +1,51 @@
+from sqlalchemy import select, text, update
+from app.code_tokens import tokenize_code
+from app.database import SessionLocal, engine
+from app.models import Card
+
+BATCH_SIZE = 1000
+
+
+def main():
+    # New databases get the column from create_all; this upgrades existing ones
+    # and tokenizes cards written before code_terms existed.
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(
+                text("ALTER TABLE cards ADD COLUMN IF NOT EXISTS code_terms JSONB")
+            )
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS idx_card_code_terms_gin "
+                    "ON cards USING gin (code_terms)"
+                )
+            )
+
+    total = 0
+    while True:
+        with SessionLocal.begin() as db:
+            rows = db.execute(
+                select(Card.id, Card.code_snippet, Card.language)
+                .where(Card.code_terms.is_(None))
+                .order_by(Card.id)
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            # Bulk UPDATE by primary key
+            db.execute(
+                update(Card),
+                [
+                    {
+                        "id": row.id,
+                        "code_terms": tokenize_code(row.code_snippet, row.language),
+                    }
+                    for row in rows
+                ],
+            )
+        total += len(rows)
+    print(f"Tokenized code of {total} cards.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import sys
+from collections import defaultdict
+from sqlalchemy import inspect, select, text, update
+from app.database import SessionLocal, engine
+from app.models import Deck, Like, Review
+import add_deck_created_at
+import add_deck_updated_at
+from app.services.deck_service import (
+    LIKE_WEIGHT,
+    REVIEW_WEIGHT,
+    fork_trending_weight,
+    trending_epoch,
+    trending_weight,
+)
+
+COUNTER_COLUMNS = [
+    ("likes_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("forks_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_sum", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("trending_score", "DOUBLE PRECISION NOT NULL DEFAULT 0"),
+]
+
+
+def missing_deck_columns():
+    """Columns of the Deck model that the decks table does not have yet."""
+    existing = {column["name"] for column in inspect(engine).get_columns("decks")}
+    return [
+        column.name for column in Deck.__table__.columns if column.name not in existing
+    ]
+
+
+def main():
+    # New databases get the columns from create_all; this upgrades existing ones
+    # and recomputes every counter from the likes, forks and reviews tables.
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for column, ddl in COUNTER_COLUMNS:
+                conn.execute(
+                    text(f"ALTER TABLE decks ADD COLUMN IF NOT EXISTS {column} {ddl}")
+                )
+        for index in Deck.__table__.indexes:
+            if index.name.startswith("idx_deck_public_"):
+                index.create(engine, checkfirst=True)
+        # The ORM statements below read and write every Deck column
+        add_deck_created_at.main()
+        add_deck_updated_at.main()
+
+    missing = missing_deck_columns()
+    if missing:
+        sys.exit(
+            f"decks is missing columns {', '.join(missing)}; recreate the "
+            "database or upgrade it with the scripts listed in docs/database.md."
+        )
+
+    with SessionLocal.begin() as db:
+        epoch = trending_epoch(db)
+        counters = defaultdict(
+            lambda: {
+                "likes_count": 0,
+                "forks_count": 0,
+                "rating_sum": 0,
+                "rating_count": 0,
+                "trending_score": 0.0,
+            }
+        )
+        for deck_id, created_at in db.execute(select(Like.deck_id, Like.created_at)):
+            counters[deck_id]["likes_count"] += 1
+            counters[deck_id]["trending_score"] += trending_weight(
+                LIKE_WEIGHT, epoch, created_at
+            )
+        for deck_id, rating, created_at in db.execute(
+            select(Review.deck_id, Review.rating, Review.created_at)
+        ):
+            counters[deck_id]["rating_sum"] += rating
+            counters[deck_id]["rating_count"] += 1
+            counters[deck_id]["trending_score"] += trending_weight(
+                REVIEW_WEIGHT, epoch, created_at
+            )
+        for fork in db.scalars(select(Deck).where(Deck.parent_id.is_not(None))):
+            counters[fork.parent_id]["forks_count"] += 1
+            weight = fork_trending_weight(fork, epoch)
+            counters[fork.parent_id]["trending_score"] += weight
+
+        db.execute(update(Deck).values(**counters.default_factory()))
+        if counters:
+            # Bulk UPDATE by primary key
+            db.execute(
+                update(Deck),
+                [{"id": deck_id, **values} for deck_id, values in counters.items()],
+            )
+    print(f"Recomputed social counters of {len(counters)} decks.")
+
+
+if __name__ == "__main__":
+    main()
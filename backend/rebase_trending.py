@@ -0,0 +1,16 @@
+from app.database import SessionLocal
+from app.services.deck_service import rebase_trending
+
+
+def main():
+    # Safe to schedule daily: it only rescales once the epoch is a year old
+    with SessionLocal.begin() as db:
+        steps = rebase_trending(db)
+    if steps:
+        print(f"Moved the trending epoch forward by {steps} half-lives.")
+    else:
+        print("Trending epoch is recent, nothing to do.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+from app.database import SessionLocal
+from app.services.roadmap_service import rebuild_all_node_mastery
+
+
+def main():
+    db = SessionLocal()
+    try:
+        print("Rebuilding materialized roadmap mastery...")
+        count = rebuild_all_node_mastery(db)
+        print(f"Rebuilt mastery for {count} user/roadmap pairs.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,22 @@ def override_get_db(db_session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function", autouse=True)
+def clear_process_caches():
+    # Cached ids and users would otherwise outlive the per-test database
+    from app import http_cache
+    from app.api.auth import user_cache
+    from app.services import ai_cache, ai_resilience, roadmap_service, search_index
+
+    roadmap_service.clear_seeding_cache()
+    user_cache.clear()
+    ai_cache.response_cache.clear()
+    ai_resilience.reset()
+    search_index.card_index.clear()
+    http_cache.bodies.clear()
+    yield
+
+
 @pytest.fixture(scope="module")
 def client():
     with TestClient(app) as c:
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import pytest
+from app.services import ai_clients
+
+
+CARD = {
+    "title": "Python List Comprehension",
+    "code_snippet": "squares = [x**2 for x in range(5)]",
+    "explanation": "Builds a list in one expression.",
+    "language": "py",
+    "tags": ["lang:py"],
+}
+
+
+class FakeCompletions:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        message = type("Message", (), {"content": json.dumps(CARD)})
+        choice = type("Choice", (), {"message": message})
+        return type("Completion", (), {"choices": [choice]})
+
+
+class FakeClient:
+    def __init__(self, delay=0):
+        self.chat = type("Chat", (), {"completions": FakeCompletions(delay)})
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    built = []
+
+    def build(provider, api_key):
+        client = FakeClient()
+        built.append((provider, api_key))
+        return client
+
+    monkeypatch.setattr(ai_clients, "_build_client", build)
+    ai_clients._clients.clear()
+    yield built
+    ai_clients._clients.clear()
+
+
+def test_clients_are_reused_per_provider_and_key(fake_clients):
+    first = ai_clients.get_client("openai", "key-1")
+    assert ai_clients.get_client("openai", "key-1") is first
+    assert ai_clients.get_client("openai", "key-2") is not first
+    assert ai_clients.get_client("groq", "key-1") is not first
+    assert len(fake_clients) == 3
+
+
+def test_cache_key_does_not_hold_the_api_key():
+    provider, digest = ai_clients._client_key("openai", "sk-secret")
+    assert provider == "openai"
+    assert "sk-secret" not in digest
+
+
+def test_close_clients(fake_clients):
+    client = ai_clients.get_client("openai", "key")
+    asyncio.run(ai_clients.close_clients())
+    assert client.closed
+    assert ai_clients.get_client("openai", "key") is not client
+
+
+def test_evicted_clients_are_closed(monkeypatch, fake_clients):
+    monkeypatch.setattr(ai_clients._clients, "maxsize", 1)
+    monkeypatch.setattr(ai_clients.settings, "AI_REQUEST_DEADLINE_SECONDS", 0.01)
+    first = ai_clients.get_client("openai", "key-1")
+
+    # Outside the event loop the evicted client is closed right away
+    second = ai_clients.get_client("openai", "key-2")
+    assert first.closed and not second.closed
+
+    async def evict_in_loop():
+        third = ai_clients.get_client("openai", "key-3")
+        # Closed only once in-flight calls have hit their deadline
+        assert not second.closed
+        await asyncio.sleep(0.05)
+        assert second.closed and not third.closed
+
+    asyncio.run(evict_in_loop())
+
+
+def test_deadline_cancels_slow_provider_call(monkeypatch, fake_clients):
+    monkeypatch.setattr(ai_clients.settings, "AI_REQUEST_DEADLINE_SECONDS", 0.05)
+    slow = FakeClient(delay=5)
+    ai_clients._clients.set(ai_clients._client_key("groq", "key"), slow)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(
+            ai_clients.with_deadline(slow.chat.completions.create(model="m"))
+        )
+
+
+def test_generate_uses_pooled_client(client, auth_headers, fake_clients):
+    payload = {"provider": "groq", "api_key": "key", "model": "m", "prompt": "x"}
+    for _ in range(2):
+        resp = client.post("/api/ai/generate", json=payload, headers=auth_headers)
+        assert resp.status_code == 200
+        assert resp.json() == CARD
+    assert fake_clients == [("groq", "key")]
+
+
+class BatchCompletions:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    async def create(self, messages, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if "broken" in messages[-1]["content"]:
+                raise RuntimeError("upstream exploded")
+            message = type("Message", (), {"content": json.dumps(CARD)})
+            choice = type("Choice", (), {"message": message})
+            return type("Completion", (), {"choices": [choice]})
+        finally:
+            self.in_flight -= 1
+
+
+def test_generate_batch_streams_ndjson_with_bounded_concurrency(
+    client, auth_headers, monkeypatch
+):
+    completions = BatchCompletions()
+    fake = FakeClient()
+    fake.chat = type("Chat", (), {"completions": completions})
+    monkeypatch.setattr(ai_clients, "_build_client", lambda provider, key: fake)
+    monkeypatch.setattr(ai_clients.settings, "AI_BATCH_CONCURRENCY", 2)
+    ai_clients._clients.clear()
+
+    prompts = ["decorators", "broken topic", "generators", "closures", "slots"]
+    payload = {"provider": "groq", "api_key": "k", "model": "m", "prompts": prompts}
+    resp = client.post("/api/ai/generate/batch", json=payload, headers=auth_headers)
+    ai_clients._clients.clear()
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == list(range(len(prompts)))
+
+    by_index = {line["index"]: line for line in lines}
+    assert "upstream exploded" in by_index[1]["error"]
+    assert by_index[0]["card"] == CARD
+    assert all(by_index[i]["prompt"] == prompts[i] for i in by_index)
+    assert completions.peak == 2
+
+
+def test_generate_batch_rejects_empty_prompt_list(client, auth_headers):
+    payload = {"provider": "groq", "api_key": "k", "model": "m", "prompts": []}
+    resp = client.post("/api/ai/generate/batch", json=payload, headers=auth_headers)
+    assert resp.status_code == 422
+
+
+class StreamingCompletions:
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    async def create(self, stream=False, **kwargs):
+        assert stream
+
+        async def chunks():
+            for piece in self.pieces:
+                delta = type("Delta", (), {"content": piece})
+                choice = type("Choice", (), {"delta": delta})
+                yield type("Chunk", (), {"choices": [choice]})
+
+        return chunks()
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def stream_with(monkeypatch, client, auth_headers, pieces):
+    fake = FakeClient()
+    fake.chat = type("Chat", (), {"completions": StreamingCompletions(pieces)})
+    monkeypatch.setattr(ai_clients, "_build_client", lambda provider, key: fake)
+    ai_clients._clients.clear()
+    payload = {"provider": "openai", "api_key": "k", "model": "m", "prompt": "x"}
+    resp = client.post("/api/ai/generate/stream", json=payload, headers=auth_headers)
+    ai_clients._clients.clear()
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    return parse_sse(resp.text)
+
+
+def test_generate_stream_relays_tokens_and_fields(client, auth_headers, monkeypatch):
+    text = json.dumps(CARD)
+    pieces = [text[i : i + 9] for i in range(0, len(text), 9)]
+    events = stream_with(monkeypatch, client, auth_headers, pieces)
+
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert "".join(tokens) == text
+    fields = [(d["name"], d["value"]) for event, d in events if event == "field"]
+    assert fields == list(CARD.items())
+    assert events[-1] == ("card", CARD)
+
+
+def test_generate_stream_reports_invalid_card(client, auth_headers, monkeypatch):
+    events = stream_with(monkeypatch, client, auth_headers, ['{"title": "Only"}'])
+    assert events[-1][0] == "error"
+    assert "AI Generation Error (openai)" in events[-1][1]["detail"]
+
+
+def test_generate_stream_rejects_unknown_provider(client, auth_headers):
+    payload = {"provider": "nope", "api_key": "k", "model": "m", "prompt": "x"}
+    resp = client.post("/api/ai/generate/stream", json=payload, headers=auth_headers)
+    assert resp.status_code == 400
+
+
+def test_generate_cache_is_opt_in(client, auth_headers, monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(ai_clients, "_build_client", lambda provider, key: fake)
+    ai_clients._clients.clear()
+    payload = {"provider": "groq", "api_key": "k", "model": "m", "prompt": "Closures"}
+
+    for _ in range(2):
+        resp = client.post("/api/ai/generate", json=payload, headers=auth_headers)
+        assert resp.status_code == 200
+    assert fake.chat.completions.calls == 2
+
+    payload["use_cache"] = True
+    for prompt in ("Python decorators", "  python   DECORATORS "):
+        payload["prompt"] = prompt
+        resp = client.post("/api/ai/generate", json=payload, headers=auth_headers)
+        assert resp.json() == CARD
+    ai_clients._clients.clear()
+
+    assert fake.chat.completions.calls == 3
+    stats = client.get("/api/system/ai-cache", headers=auth_headers).json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_generate_falls_back_to_second_provider(client, auth_headers, monkeypatch):
+    clients = {"groq": FakeClient(delay=5), "openai": FakeClient()}
+    monkeypatch.setattr(
+        ai_clients, "_build_client", lambda provider, key: clients[provider]
+    )
+    monkeypatch.setattr(ai_clients.settings, "AI_HEDGE_DEFAULT_DELAY_SECONDS", 0.01)
+    ai_clients._clients.clear()
+
+    payload = {
+        "provider": "groq",
+        "api_key": "k",
+        "model": "m",
+        "prompt": "x",
+        "fallback": {"provider": "openai", "api_key": "k2", "model": "m2"},
+    }
+    resp = client.post("/api/ai/generate", json=payload, headers=auth_headers)
+    ai_clients._clients.clear()
+
+    assert resp.status_code == 200
+    assert resp.json() == CARD
+    health = client.get("/api/system/ai-providers", headers=auth_headers).json()
+    assert health["openai"]["samples"] == 1
+    assert health["groq"]["state"] == "closed"
@@ -0,0 +1,47 @@
+from app.services import ai_cache
+from app.services.ai_cache import DiskCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_normalizes_prompt_only():
+    key = ai_cache.cache_key(1, "Python  decorators\n", "groq", "m")
+    assert key == ai_cache.cache_key(1, "python decorators", "groq", "m")
+    assert key != ai_cache.cache_key(2, "python decorators", "groq", "m")
+    assert key != ai_cache.cache_key(1, "python decorators", "openai", "m")
+    assert key != ai_cache.cache_key(1, "python decorators", "groq", "m2")
+
+
+def test_disk_cache_expiry_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    timer = FakeTimer()
+    cache = DiskCache(path, maxsize=10, ttl=60, timer=timer)
+    cache.set("a", {"title": "A"})
+
+    assert DiskCache(path, maxsize=10, ttl=60, timer=timer).get("a") == {"title": "A"}
+    timer.now += 61
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "maxsize": 10, "hits": 0, "misses": 1}
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    timer = FakeTimer()
+    cache = DiskCache(str(tmp_path / "c.sqlite3"), maxsize=2, ttl=None, timer=timer)
+    for key in ("a", "b"):
+        timer.now += 1
+        cache.set(key, key)
+    timer.now += 1
+    assert cache.get("a") == "a"
+    timer.now += 1
+    cache.set("c", "c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.get("c") == "c"
+    assert len(cache) == 2
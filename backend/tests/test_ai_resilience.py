@@ -0,0 +1,159 @@
+import asyncio
+import httpx
+import openai
+import pytest
+from app.services import ai_resilience
+from app.services.ai_resilience import CircuitOpenError, ProviderHealth
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def server_error():
+    request = httpx.Request("POST", "https://api.example.com")
+    response = httpx.Response(503, request=request)
+    return openai.InternalServerError("overloaded", response=response, body=None)
+
+
+def rate_limited():
+    request = httpx.Request("POST", "https://api.example.com")
+    response = httpx.Response(429, request=request)
+    return openai.RateLimitError("quota exceeded", response=response, body=None)
+
+
+def test_breaker_opens_after_consecutive_failures_then_half_opens():
+    timer = FakeTimer()
+    entry = ProviderHealth("groq", 3, reset_seconds=30, window=10, timer=timer)
+    for _ in range(3):
+        entry.acquire()
+        entry.record_failure()
+    assert entry.state == "open"
+    with pytest.raises(CircuitOpenError):
+        entry.acquire()
+
+    timer.now += 31
+    entry.acquire()  # single trial call
+    with pytest.raises(CircuitOpenError):
+        entry.acquire()
+    entry.record_success(0.5)
+    assert entry.state == "closed"
+    assert entry.consecutive_failures == 0
+
+
+def test_only_provider_health_errors_trip_the_breaker(monkeypatch):
+    monkeypatch.setattr(ai_resilience.settings, "AI_BREAKER_FAILURE_THRESHOLD", 2)
+
+    async def fail(error):
+        raise error
+
+    async def run(error):
+        with pytest.raises(type(error)):
+            await ai_resilience.guarded("openai", fail(error))
+
+    for _ in range(3):
+        asyncio.run(run(ValueError("invalid api key")))
+    assert ai_resilience.health("openai").state == "closed"
+
+    for _ in range(2):
+        asyncio.run(run(server_error()))
+    assert ai_resilience.health("openai").state == "open"
+
+    never_awaited = fail(ValueError())
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(ai_resilience.guarded("openai", never_awaited))
+
+
+
+def test_one_keys_rate_limit_does_not_lock_out_other_keys(monkeypatch):
+    monkeypatch.setattr(ai_resilience.settings, "AI_BREAKER_FAILURE_THRESHOLD", 2)
+
+    async def call(api_key):
+        if api_key == "exhausted":
+            raise rate_limited()
+        return api_key
+
+    async def run():
+        for _ in range(5):
+            with pytest.raises(openai.RateLimitError):
+                await ai_resilience.guarded("openai", call("exhausted"))
+        return await ai_resilience.guarded("openai", call("healthy"))
+
+    assert asyncio.run(run()) == "healthy"
+    assert ai_resilience.health("openai").state == "closed"
+
+    async def fallback():
+        return "fallback"
+
+    result = asyncio.run(
+        ai_resilience.hedged(
+            "openai",
+            lambda: ai_resilience.guarded("openai", call("exhausted")),
+            fallback,
+        )
+    )
+    assert result == "fallback"
+
+
+def test_hedge_delay_uses_p95_once_warm(monkeypatch):
+    monkeypatch.setattr(ai_resilience.settings, "AI_HEDGE_MIN_SAMPLES", 20)
+    monkeypatch.setattr(ai_resilience.settings, "AI_HEDGE_DEFAULT_DELAY_SECONDS", 7)
+    entry = ai_resilience.health("groq")
+    assert ai_resilience.hedge_delay("groq") == 7
+    for latency in range(1, 101):
+        entry.record_success(latency / 100)
+    assert ai_resilience.hedge_delay("groq") == 0.96
+
+
+def answer(value, delay=0.0, error=None):
+    async def call():
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return value
+
+    return call
+
+
+def test_hedged_prefers_fast_primary(monkeypatch):
+    monkeypatch.setattr(ai_resilience.settings, "AI_HEDGE_DEFAULT_DELAY_SECONDS", 1)
+    result = asyncio.run(
+        ai_resilience.hedged("groq", answer("primary"), answer("fallback"))
+    )
+    assert result == "primary"
+
+
+def test_hedged_sends_backup_request_when_primary_is_slow(monkeypatch):
+    monkeypatch.setattr(ai_resilience.settings, "AI_HEDGE_DEFAULT_DELAY_SECONDS", 0.01)
+    cancelled = []
+
+    def slow():
+        async def call():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        return call()
+
+    result = asyncio.run(ai_resilience.hedged("groq", slow, answer("fallback")))
+    assert result == "fallback"
+    assert cancelled == [True]
+
+
+def test_hedged_falls_back_on_primary_error_and_reraises_it(monkeypatch):
+    monkeypatch.setattr(ai_resilience.settings, "AI_HEDGE_DEFAULT_DELAY_SECONDS", 1)
+    broken = answer(None, error=RuntimeError("primary down"))
+    assert asyncio.run(ai_resilience.hedged("groq", broken, answer("ok"))) == "ok"
+
+    with pytest.raises(RuntimeError, match="primary down"):
+        asyncio.run(
+            ai_resilience.hedged(
+                "groq", broken, answer(None, error=RuntimeError("backup down"))
+            )
+        )
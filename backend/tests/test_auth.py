@@ -70,3 +70,38 @@ def test_user_creation_and_update(client):
     # Check if updated (via token decoding if we had a profile endpoint,
     # but here we'll just check it doesn't fail)
     assert "access_token" in response.json()
+
+
+def test_authenticated_user_is_cached_and_invalidated(client, db_engine):
+    from sqlalchemy import event
+
+    payload = {
+        "email": "test@example.com",
+        "github_id": "12345",
+        "username": "testuser",
+        "shared_secret": settings.INTERNAL_AUTH_SECRET,
+    }
+    token = client.post("/api/auth/github-exchange", json=payload).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    user_lookups = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        sql = statement.lstrip().upper()
+        if sql.startswith("SELECT") and "FROM USERS" in sql:
+            user_lookups.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+        assert len(user_lookups) == 1
+        assert client.get("/api/decks/", headers=headers).status_code == 200
+        assert len(user_lookups) == 1  # Served from the cache
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+
+    # Updating the profile through the exchange invalidates the cached user
+    payload["username"] = "renamed"
+    client.post("/api/auth/github-exchange", json=payload)
+    me = client.get("/api/auth/me", headers=headers).json()
+    assert me["username"] == "renamed"
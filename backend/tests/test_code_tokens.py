@@ -0,0 +1,93 @@
+from app.code_tokens import identifier_parts, query_terms, tokenize_code
+from app.models import Card, Deck, User
+
+FASTAPI_SNIPPET = """
+@app.get("/users/{user_id}")
+async def getUserById(user_id: int, db=Depends(get_db)):
+    async with db.begin():
+        return db.user?.name
+"""
+
+
+def test_tokenize_keeps_symbols_whole_and_split():
+    terms = tokenize_code(FASTAPI_SNIPPET, "python")
+    for term in [
+        "@app.get",
+        "app.get",
+        "app",
+        "get",
+        "depends(",
+        "async with",
+        "getuserbyid",
+        "user",
+        "by",
+        "id",
+        "?.",
+    ]:
+        assert term in terms
+    assert len(terms) == len(set(terms))
+
+
+def test_tokenize_language_specific_names():
+    assert "__init__" in tokenize_code("def __init__(self):", "python")
+    assert "init" in tokenize_code("def __init__(self):", "python")
+    rust = tokenize_code("use std::io::Result;", "rust")
+    assert {"std::io::result", "std", "io", "result"} <= set(rust)
+    assert "btn-primary" in tokenize_code(".btn-primary { color: red }", "css")
+    assert "$user->getname" in tokenize_code("$user->getName();", "php")
+    assert tokenize_code("", "python") == [] and tokenize_code(None) == []
+
+
+def test_identifier_parts():
+    assert identifier_parts("HTTPServerError") == ["http", "server", "error"]
+    assert identifier_parts("get_db") == ["get", "db"]
+    assert identifier_parts("btn-primary") == ["btn", "primary"]
+
+
+def test_query_terms_keep_most_specific_form():
+    assert query_terms("@app.get", "python") == ["@app.get"]
+    assert query_terms("@app.get") == ["@app.get"]
+    assert query_terms("Depends(") == ["depends("]
+    assert query_terms("async with") == ["async with"]
+    assert query_terms("std::io::Result", "rust") == ["std::io::result"]
+
+
+def test_code_search_endpoint(client, db_session, auth_headers):
+    user = db_session.query(User).filter(User.email == "test@example.com").first()
+    deck = Deck(title="Code Deck", owner_id=user.id)
+    db_session.add(deck)
+    db_session.flush()
+
+    def card(title, code, language="python"):
+        return Card(
+            deck_id=deck.id,
+            title=title,
+            explanation="n/a",
+            code_snippet=code,
+            language=language,
+        )
+
+    route = card("Route", '@app.get("/")\ndef index(): ...')
+    call = card("Call", "items = app.get_items()")
+    ctx = card("Context", "async with session:\n    await session.commit()")
+    js = card("JS", "app.get('/', handler)", language="javascript")
+    db_session.add_all([route, call, ctx, js])
+    db_session.commit()
+
+    def search(query):
+        response = client.get(
+            "/api/cards/code-search", params=query, headers=auth_headers
+        )
+        assert response.status_code == 200
+        return [hit["title"] for hit in response.json()]
+
+    assert search({"q": "@app.get"}) == ["Route"]
+    assert search({"q": "app.get"}) == ["Route", "JS"]
+    assert search({"q": "app.get", "language": "javascript"}) == ["JS"]
+    assert search({"q": "async with"}) == ["Context"]
+    assert search({"q": "get_items("}) == ["Call"]
+
+    # Editing the snippet re-tokenizes it
+    ctx.code_snippet = "with open(path) as f: ..."
+    db_session.commit()
+    assert search({"q": "async with"}) == []
@@ -38,37 +38,45 @@ def test_card_filtering_by_language(client, db_session, auth_headers):
     assert data[0]["language"] == "python"
 
 
-def test_card_filtering_by_tags_partial(client, db_session, auth_headers):
+def test_card_filtering_by_tags_exact_and_namespace(client, db_session, auth_headers):
     user = db_session.query(User).filter(User.email == "test@example.com").first()
     deck = Deck(title="Test Deck", owner_id=user.id, is_public=True)
     db_session.add(deck)
     db_session.flush()
 
-    c1 = Card(
-        deck_id=deck.id,
-        title="DI Card",
-        explanation="DI exp",
-        code_snippet="def di(): pass",
-        language="python",
-        tags=["pattern:dependency-injection"],
-    )
-    c2 = Card(
-        deck_id=deck.id,
-        title="Auth Card",
-        explanation="Auth exp",
-        code_snippet="def auth(): pass",
-        language="python",
-        tags=["pattern:auth"],
-    )
-    db_session.add_all([c1, c2])
+    def card(title, tags):
+        return Card(
+            deck_id=deck.id,
+            title=title,
+            explanation="exp",
+            code_snippet="pass",
+            language="python",
+            tags=tags,
+        )
+
+    di = card("DI Card", ["pattern:dependency-injection", "lang:py"])
+    auth = card("Auth Card", ["pattern:auth", "lang:pyspark"])
+    plain = card("Plain Card", ["concept:io"])
+    db_session.add_all([di, auth, plain])
     db_session.commit()
 
-    # Test partial tag match: 'injection' should match 'pattern:dependency-injection'
-    response = client.get("/api/cards/?tags__contains=injection", headers=auth_headers)
-    assert response.status_code == 200
-    data = response.json()
-    assert len(data) == 1
-    assert data[0]["title"] == "DI Card"
+    def titles(query):
+        response = client.get(f"/api/cards/?{query}", headers=auth_headers)
+        assert response.status_code == 200
+        return sorted(card["title"] for card in response.json())
+
+    # Tags match exactly: no substring false positives
+    assert titles("tags__contains=injection") == []
+    assert titles("tags__contains=lang:py") == ["DI Card"]
+    # Every tag must be present by default
+    assert titles("tags__contains=lang:py,pattern:auth") == []
+    any_tag = "tags__contains=lang:py,pattern:auth&tags_match=any"
+    assert titles(any_tag) == ["Auth Card", "DI Card"]
+    # `namespace:*` matches any tag of the namespace
+    assert titles("tags__contains=pattern:*") == ["Auth Card", "DI Card"]
+    assert titles("tags__contains=pattern:*,lang:pyspark") == ["Auth Card"]
+    any_tag = "tags__contains=pattern:*,concept:io&tags_match=any"
+    assert titles(any_tag) == ["Auth Card", "DI Card", "Plain Card"]
 
 
 def test_card_global_search(client, db_session, auth_headers):
@@ -134,3 +142,41 @@ def test_deck_marketplace_filtering(client, db_session, auth_headers):
     data = response.json()
     assert len(data) == 1
     assert data[0]["title"] == "Python Basics"
+
+
+def test_ranked_search_orders_by_weighted_field_and_caps_top_k(
+    client, db_session, auth_headers
+):
+    user = db_session.query(User).filter(User.email == "test@example.com").first()
+    deck = Deck(title="Search Deck", owner_id=user.id, is_public=False)
+    db_session.add(deck)
+    db_session.flush()
+
+    def card(title, explanation="n/a", code="pass", tags=()):
+        return Card(
+            deck_id=deck.id,
+            title=title,
+            explanation=explanation,
+            code_snippet=code,
+            language="python",
+            tags=list(tags),
+        )
+
+    in_code = card("Loop", code="# decorator applied below")
+    in_title = card("Decorator basics")
+    in_explanation = card("Wrappers", explanation="A decorator wraps a function")
+    unrelated = card("Generators")
+    db_session.add_all([in_code, in_title, in_explanation, unrelated])
+    db_session.commit()
+
+    response = client.get("/api/cards/search?q=decorator", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [hit["id"] for hit in data] == [in_title.id, in_explanation.id, in_code.id]
+    assert data[0]["score"] > data[1]["score"] > data[2]["score"]
+
+    response = client.get("/api/cards/search?q=decorator&k=1", headers=auth_headers)
+    assert [hit["id"] for hit in response.json()] == [in_title.id]
+
+    response = client.get("/api/cards/search?q=", headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,171 @@
+from sqlalchemy import event
+from app import http_cache
+from app.database import settings
+from app.models import Roadmap
+from app.services.roadmap_service import ingest_roadmaps
+
+
+def get_auth_header(client, email: str, username: str, github_id: str):
+    payload = {
+        "email": email,
+        "github_id": github_id,
+        "username": username,
+        "shared_secret": settings.INTERNAL_AUTH_SECRET,
+    }
+    response = client.post("/api/auth/github-exchange", json=payload)
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def count_queries(db_engine, call):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        response = call()
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+    return response, statements
+
+
+def test_roadmaps_are_cached_and_revalidated(client, db_session, db_engine):
+    ingest_roadmaps(db_session)
+    header = get_auth_header(client, "user_a@example.com", "usera", "1")
+
+    first = client.get("/api/roadmaps/python-core", headers=header)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("public, max-age=")
+    assert first.headers["Last-Modified"].endswith("GMT")
+
+    # A repeat fetch is served from the cached body without touching roadmaps
+    repeat, statements = count_queries(
+        db_engine, lambda: client.get("/api/roadmaps/python-core", headers=header)
+    )
+    assert repeat.content == first.content
+    assert not any("roadmaps" in statement for statement in statements)
+
+    conditional = {**header, "If-None-Match": etag}
+    not_modified = client.get("/api/roadmaps/python-core", headers=conditional)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    since = {**header, "If-Modified-Since": first.headers["Last-Modified"]}
+    assert client.get("/api/roadmaps/python-core", headers=since).status_code == 304
+
+    # A new roadmap version changes the ETag, once the cached body is dropped
+    # (ingestion does that in its own process; others wait for the TTL)
+    roadmap = db_session.get(Roadmap, "python-core")
+    roadmap.version = "999.0.0"
+    db_session.commit()
+    stale = client.get("/api/roadmaps/python-core", headers=conditional)
+    assert stale.status_code == 304
+    ingest_roadmaps(db_session)
+    assert len(http_cache.bodies) == 0
+    roadmap.version = "999.0.0"
+    db_session.commit()
+    changed = client.get("/api/roadmaps/python-core", headers=conditional)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["version"] == "999.0.0"
+
+    listing = client.get("/api/roadmaps/")
+    assert listing.status_code == 200
+    conditional = {"If-None-Match": listing.headers["ETag"]}
+    assert client.get("/api/roadmaps/", headers=conditional).status_code == 304
+
+
+def test_public_deck_etag_changes_with_deck_and_cards(client):
+    header_a = get_auth_header(client, "user_a@example.com", "usera", "1")
+    header_b = get_auth_header(client, "user_b@example.com", "userb", "2")
+    deck_id = client.post(
+        "/api/decks/", headers=header_a, json={"title": "Cached", "is_public": True}
+    ).json()["id"]
+
+    def fetch(etag=None):
+        headers = {**header_b, "If-None-Match": etag} if etag else header_b
+        return client.get(f"/api/decks/{deck_id}", headers=headers)
+
+    first = fetch()
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    etag = first.headers["ETag"]
+    assert fetch(etag).status_code == 304
+
+    # Counters changed: new representation
+    client.post(f"/api/decks/{deck_id}/like", headers=header_b)
+    liked = fetch(etag)
+    assert liked.status_code == 200
+    assert liked.json()["likes_count"] == 1
+    etag = liked.headers["ETag"]
+
+    # Card writes touch the deck too
+    card = client.post(
+        "/api/cards/",
+        headers=header_a,
+        json={
+            "deck_id": deck_id,
+            "title": "New card",
+            "code_snippet": "pass",
+            "explanation": "noop",
+            "language": "python",
+        },
+    ).json()
+    with_card = fetch(etag)
+    assert with_card.status_code == 200
+    assert [c["title"] for c in with_card.json()["cards"]] == ["New card"]
+    etag = with_card.headers["ETag"]
+
+    review = {"rating": 5}
+    client.post(f"/api/cards/{card['id']}/review", headers=header_a, json=review)
+    reviewed = fetch(etag)
+    assert reviewed.status_code == 200
+    assert reviewed.json()["cards"][0]["repetitions"] == 1
+    etag = reviewed.headers["ETag"]
+
+    # Deck reviews (rating stats) and the owner's username are in the body too
+    client.post(f"/api/decks/{deck_id}/reviews", headers=header_b, json=review)
+    rated = fetch(etag)
+    assert rated.status_code == 200
+    assert rated.json()["rating_avg"] == 5.0
+    etag = rated.headers["ETag"]
+    get_auth_header(client, "user_a@example.com", "renamed", "1")
+    renamed = fetch(etag)
+    assert renamed.status_code == 200
+    assert renamed.json()["owner_username"] == "renamed"
+
+    # Private decks are never cached
+    client.put(f"/api/decks/{deck_id}", headers=header_a, json={"is_public": False})
+    assert fetch(renamed.headers["ETag"]).status_code == 403
+    private = client.get(f"/api/decks/{deck_id}", headers=header_a)
+    assert private.status_code == 200
+    assert "ETag" not in private.headers
+
+
+def test_card_writes_only_touch_public_decks(client, db_session):
+    from app.models import Deck
+
+    header = get_auth_header(client, "user_a@example.com", "usera", "1")
+    deck_id = client.post(
+        "/api/decks/", headers=header, json={"title": "Private", "is_public": False}
+    ).json()["id"]
+    before = db_session.get(Deck, deck_id).updated_at
+
+    card = {
+        "deck_id": deck_id,
+        "title": "Card",
+        "code_snippet": "pass",
+        "explanation": "noop",
+        "language": "python",
+    }
+    card_id = client.post("/api/cards/", headers=header, json=card).json()["id"]
+    review = {"rating": 4}
+    client.post(f"/api/cards/{card_id}/review", headers=header, json=review)
+
+    deck = db_session.get(Deck, deck_id)
+    db_session.refresh(deck)
+    assert deck.updated_at == before
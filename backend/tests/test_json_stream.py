@@ -0,0 +1,32 @@
+import json
+from app.json_stream import JSONFieldStream
+
+CARD_TEXT = (
+    '```json\n{"title": "Escaped \\"quotes\\" }", "code_snippet": "x = [1]\\nprint(x)",'
+    ' "tags": ["lang:py", "syntax:]"], "meta": {"level": [1, 2]}, "score": 4.5,'
+    ' "draft": false}\n```'
+)
+
+
+def collect(text, size):
+    stream = JSONFieldStream()
+    fields = []
+    for start in range(0, len(text), size):
+        fields.extend(stream.feed(text[start : start + size]))
+    return stream, fields
+
+
+def test_fields_match_full_parse_for_any_chunking():
+    expected = list(json.loads(CARD_TEXT.split("```json")[1].split("```")[0]).items())
+    for size in (1, 2, 7, len(CARD_TEXT)):
+        stream, fields = collect(CARD_TEXT, size)
+        assert fields == expected
+        assert stream.done
+
+
+def test_field_is_emitted_when_its_value_closes():
+    stream = JSONFieldStream()
+    assert stream.feed('{"title": "Rust Own') == []
+    assert stream.feed('ership", "tags": ["a"') == [("title", "Rust Ownership")]
+    assert stream.feed("]") == [("tags", ["a"])]
+    assert not stream.done
@@ -0,0 +1,135 @@
+import pytest
+from app.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor
+from app.models import Card, Deck, User
+
+
+def _seed_cards(db_session, count):
+    user = db_session.query(User).filter(User.email == "test@example.com").first()
+    deck = Deck(title="Big Deck", owner_id=user.id, is_public=False)
+    db_session.add(deck)
+    db_session.flush()
+    db_session.add_all(
+        [
+            Card(
+                deck_id=deck.id,
+                title=f"Card {i}",
+                explanation="exp",
+                code_snippet="pass",
+                language="python",
+                tags=[],
+            )
+            for i in range(count)
+        ]
+    )
+    db_session.commit()
+    return deck.id
+
+
+def _walk(client, url, headers):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        resp = client.get(url, headers=headers, params=params)
+        assert resp.status_code == 200
+        pages.append([item["id"] for item in resp.json()])
+        cursor = resp.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+def test_card_listing_cursor_pagination(client, db_session, auth_headers):
+    deck_id = _seed_cards(db_session, 5)
+
+    for url in ("/api/cards/", f"/api/decks/{deck_id}/cards"):
+        pages = _walk(client, url, auth_headers)
+        assert [len(p) for p in pages] == [2, 2, 1]
+        ids = [card_id for p in pages for card_id in p]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == 5
+
+
+def test_deck_listing_cursor_pagination(client, auth_headers):
+    created = [
+        client.post(
+            "/api/decks/",
+            headers=auth_headers,
+            json={"title": f"Deck {i}", "is_public": True},
+        ).json()["id"]
+        for i in range(3)
+    ]
+
+    for url in ("/api/decks/", "/api/decks/marketplace"):
+        pages = _walk(client, url, auth_headers)
+        assert [len(p) for p in pages] == [2, 1]
+        assert [deck_id for p in pages for deck_id in p] == created
+
+
+def test_page_size_is_capped(client, auth_headers):
+    resp = client.get(
+        "/api/cards/", headers=auth_headers, params={"limit": MAX_PAGE_SIZE + 1}
+    )
+    assert resp.status_code == 422
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers):
+    resp = client.get(
+        "/api/cards/", headers=auth_headers, params={"cursor": "not-a-cursor"}
+    )
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid cursor"
+
+
+def test_decode_cursor_checks_key_count():
+    from fastapi import HTTPException
+    from app.pagination import encode_cursor
+
+    assert decode_cursor(encode_cursor([0.5, 7]), 2) == [0.5, 7]
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor([7]), 2)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [[0.5, "7"], [0.5, 7.5], [0.5, True], [None, 7], ["not-a-date", 7], [[1], 7]],
+)
+def test_decode_cursor_checks_value_types(values):
+    from fastapi import HTTPException
+    from app.pagination import encode_cursor
+
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(encode_cursor(values), 2)
+    assert excinfo.value.status_code == 400
+
+
+def test_timestamp_sort_keys_round_trip(db_session, auth_headers):
+    from datetime import datetime, timedelta, timezone
+    from fastapi import Response
+    from app.pagination import PageParams, encode_cursor, paginate
+
+    values = [datetime(2025, 1, 1, tzinfo=timezone.utc), 7]
+    assert decode_cursor(encode_cursor(values), 2) == values
+
+    deck_id = _seed_cards(db_session, 5)
+    start = datetime(2025, 1, 1)
+    cards = db_session.query(Card).filter(Card.deck_id == deck_id).all()
+    for i, card in enumerate(cards):
+        card.next_review = start - timedelta(days=i)
+    db_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        response = Response()
+        page = paginate(
+            db_session.query(Card).filter(Card.deck_id == deck_id),
+            PageParams(cursor=cursor, limit=2),
+            response,
+            Card.id,
+            sort_column=Card.next_review,
+        )
+        seen += [card.id for card in page]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert seen == [card.id for card in reversed(cards)]
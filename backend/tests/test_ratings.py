@@ -102,3 +102,35 @@ def test_rating_edge_cases(client):
         f"/api/decks/{public_id}/reviews", headers=header_b, json={"rating": 0}
     )
     assert review_resp.status_code == 422
+
+
+def test_review_upsert_keeps_one_review_per_user(client, db_session, db_engine):
+    from sqlalchemy import inspect
+    from app.models import Review
+
+    header_a = get_auth_header(client, "user_a@example.com", "usera", "1")
+    header_b = get_auth_header(client, "user_b@example.com", "userb", "2")
+    deck_id = client.post(
+        "/api/decks/", headers=header_a, json={"title": "Upsert", "is_public": True}
+    ).json()["id"]
+
+    def review(header, rating):
+        resp = client.post(
+            f"/api/decks/{deck_id}/reviews", headers=header, json={"rating": rating}
+        )
+        assert resp.status_code == 200
+        body = resp.json()
+        return body["rating"], body["deck_rating_avg"], body["deck_rating_count"]
+
+    assert review(header_a, 4) == (4, 4.0, 1)
+    first_id = db_session.query(Review.id).filter(Review.deck_id == deck_id).scalar()
+    assert review(header_a, 2) == (2, 2.0, 1)
+    assert review(header_b, 5) == (5, 3.5, 2)
+
+    reviews = db_session.query(Review).filter(Review.deck_id == deck_id).all()
+    assert len(reviews) == 2
+    assert first_id in [r.id for r in reviews]
+
+    # Backed by a (user_id, deck_id) unique constraint
+    constraints = inspect(db_engine).get_unique_constraints("reviews")
+    assert {"uq_review_user_deck"} == {c["name"] for c in constraints}
@@ -84,3 +84,210 @@ def test_mastery_with_cards(client):
             assert node["mastery_percentage"] == 0  # interval is 0
             found = True
     assert found
+
+
+def test_mastery_counts_mastered_cards_per_node(client, db_session):
+    from app.models import Card, Deck, User
+
+    header = get_auth_header(client, "test@example.com", "testuser", "123")
+    user = db_session.query(User).filter(User.email == "test@example.com").first()
+    deck = Deck(title="Python", owner_id=user.id)
+    db_session.add(deck)
+    db_session.flush()
+
+    def card(tags, interval):
+        return Card(
+            deck_id=deck.id,
+            title="c",
+            code_snippet="pass",
+            explanation="exp",
+            language="python",
+            tags=tags,
+            interval=interval,
+        )
+
+    db_session.add_all(
+        [
+            card(["lang:python", "concept:oop"], 30),
+            card(["lang:python", "concept:oop", "pattern:mixin"], 3),
+            card(["lang:python", "syntax:exceptions"], 21),
+            card(["concept:oop"], 50),  # Missing lang:python
+        ]
+    )
+    db_session.commit()
+
+    resp = client.get("/api/roadmaps/python-core/mastery", headers=header)
+    mastery = {node["node_id"]: node for node in resp.json()}
+
+    assert mastery["root"]["total_cards"] == 3
+    assert mastery["root"]["mastered_cards"] == 2
+    assert mastery["py-oop"]["total_cards"] == 2
+    assert mastery["py-oop"]["mastered_cards"] == 1
+    assert mastery["py-oop"]["mastery_percentage"] == 50
+    assert mastery["py-error-handling"]["mastered_cards"] == 1
+    assert mastery["py-async"]["total_cards"] == 0
+
+
+def test_materialized_mastery_is_maintained_incrementally(client, db_session):
+    from app import models
+    from app.services.roadmap_service import rebuild_node_mastery
+
+    header = get_auth_header(client, "test@example.com", "testuser", "123")
+    roadmap_id = "python-core"
+    deck_id = client.post("/api/decks/", headers=header, json={"title": "Deck"})
+    deck_id = deck_id.json()["id"]
+
+    def create_card(tags):
+        return client.post(
+            "/api/cards/",
+            headers=header,
+            json={
+                "deck_id": deck_id,
+                "title": "c",
+                "code_snippet": "pass",
+                "explanation": "exp",
+                "language": "python",
+                "tags": tags,
+            },
+        ).json()["id"]
+
+    def mastery():
+        resp = client.get(f"/api/roadmaps/{roadmap_id}/mastery", headers=header)
+        return {
+            n["node_id"]: (n["total_cards"], n["mastered_cards"]) for n in resp.json()
+        }
+
+    oop_card = create_card(["lang:python", "concept:oop"])
+    assert mastery()["py-oop"] == (1, 0)  # Materialized on first read
+
+    error_card = create_card(["lang:python", "syntax:exceptions"])
+    client.put(
+        f"/api/cards/{oop_card}",
+        headers=header,
+        json={"tags": ["lang:python", "syntax:exceptions"]},
+    )
+    for _ in range(4):  # Intervals 1, 6, 15, 38 -> mastered
+        client.post(
+            f"/api/cards/{error_card}/review", headers=header, json={"rating": 5}
+        )
+    client.post(
+        "/api/cards/reviews/batch",
+        headers=header,
+        json={"reviews": [{"card_id": oop_card, "rating": 5}]},
+    )
+    client.delete(f"/api/cards/{create_card(['lang:python'])}", headers=header)
+
+    incremental = mastery()
+    assert incremental["py-oop"] == (0, 0)
+    assert incremental["py-error-handling"] == (2, 1)
+    assert incremental["root"] == (2, 1)
+
+    user = db_session.query(models.User).filter_by(email="test@example.com").one()
+    roadmap = db_session.get(models.Roadmap, roadmap_id)
+    rebuilt = rebuild_node_mastery(db_session, user.id, roadmap)
+    assert incremental == {
+        row["node_id"]: (row["total_cards"], row["mastered_cards"]) for row in rebuilt
+    }
+
+
+def test_card_changes_that_keep_counts_skip_roadmaps(client, monkeypatch):
+    from app.services import roadmap_service
+
+    header = get_auth_header(client, "test@example.com", "testuser", "123")
+    deck_id = client.post("/api/decks/", headers=header, json={"title": "D"})
+    card = {
+        "deck_id": deck_id.json()["id"],
+        "title": "c",
+        "code_snippet": "pass",
+        "explanation": "exp",
+        "language": "python",
+        "tags": ["lang:python"],
+    }
+    card_id = client.post("/api/cards/", headers=header, json=card).json()["id"]
+    client.get("/api/roadmaps/python-core/mastery", headers=header)
+
+    def fail(roadmap):
+        raise AssertionError("roadmap nodes walked")
+
+    monkeypatch.setattr(roadmap_service, "_roadmap_nodes", fail)
+    resp = client.put(f"/api/cards/{card_id}", headers=header, json={"title": "n"})
+    assert resp.status_code == 200
+    # Interval 0 -> 1 stays below the mastery threshold
+    resp = client.post(
+        f"/api/cards/{card_id}/review", headers=header, json={"rating": 5}
+    )
+    assert resp.status_code == 200
+
+
+def test_concurrent_first_mastery_reads_do_not_conflict(
+    client, db_session, monkeypatch
+):
+    from app import models
+    from app.services import roadmap_service
+
+    header = get_auth_header(client, "test@example.com", "testuser", "123")
+    compute = roadmap_service._compute_node_mastery
+
+    def compute_after_other_reader(db, user_id, roadmap):
+        rows = compute(db, user_id, roadmap)
+        # Another request materializes the same rows in between
+        db.execute(models.RoadmapNodeMastery.__table__.insert(), rows)
+        return rows
+
+    monkeypatch.setattr(
+        roadmap_service, "_compute_node_mastery", compute_after_other_reader
+    )
+    resp = client.get("/api/roadmaps/python-core/mastery", headers=header)
+    assert resp.status_code == 200
+    assert resp.json()[0]["node_id"] == "root"
+
+
+def test_subscribe_seeds_starter_cards(client, db_session):
+    from app.models import Card, Deck, Roadmap, User
+
+    admin = User(email="admin@example.com", username="admin")
+    db_session.add(admin)
+    db_session.flush()
+    canonical = Deck(title="Canonical", owner_id=admin.id, is_public=True)
+    db_session.add(canonical)
+    db_session.flush()
+    db_session.add_all(
+        [
+            Card(
+                deck_id=canonical.id,
+                title=f"Starter {i}",
+                code_snippet="pass",
+                explanation="exp",
+                language="python",
+                tags=["lang:python"],
+                roadmap_id="python-core",
+                roadmap_title="Python Core",
+            )
+            for i in range(3)
+        ]
+    )
+    db_session.commit()
+
+    header = get_auth_header(client, "test@example.com", "testuser", "123")
+    resp = client.post(
+        "/api/roadmaps/python-core/subscribe?include_default_cards=true",
+        headers=header,
+    )
+    assert resp.status_code == 200
+
+    decks = client.get("/api/decks/", headers=header).json()
+    title = db_session.get(Roadmap, "python-core").title
+    assert [d["title"] for d in decks] == [f"Starter: {title}"]
+    assert decks[0]["card_count"] == 3
+
+    cards = client.get(f"/api/decks/{decks[0]['id']}/cards", headers=header).json()
+    assert [c["title"] for c in cards] == ["Starter 0", "Starter 1", "Starter 2"]
+    assert all(c["roadmap_id"] == "python-core" for c in cards)
+
+    # A roadmap without canonical cards does not leave an empty deck behind
+    header_b = get_auth_header(client, "b@example.com", "userb", "456")
+    client.post(
+        "/api/roadmaps/fastapi-backend-developer/subscribe?include_default_cards=true",
+        headers=header_b,
+    )
+    assert client.get("/api/decks/", headers=header_b).json() == []
@@ -0,0 +1,146 @@
+import pytest
+from app.models import Card, Deck, User
+from app.services import search_index
+from app.services.search_index import SearchIndex
+
+
+def fields(title, tags=(), explanation="", code=""):
+    return {
+        "title": title,
+        "tags": list(tags),
+        "explanation": explanation,
+        "code": code,
+    }
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add(1, 10, 100, fields("Python decorators", ["lang:py"], "Wraps functions"))
+    index.add(2, 10, 100, fields("Rust ownership", ["lang:rust"], "Borrow checker"))
+    index.add(3, 10, 101, fields("Generators", ["lang:py"], code="yield decorator"))
+    index.add(4, 20, 200, fields("Python decorators", ["lang:py"]))
+    return index
+
+
+def ids(hits):
+    return [card_id for card_id, _ in hits]
+
+
+def test_prefix_matches_last_term_and_ranks_by_field(index):
+    assert ids(index.search(10, "decor")) == [1, 3]
+    assert ids(index.search(10, "py decor")) == [1, 3]
+    assert ids(index.search(10, "decor", deck_id=101)) == [3]
+    # Only the last term is a prefix
+    assert index.search(10, "decor python") == []
+
+
+def test_fuzzy_tolerates_one_edit(index):
+    assert ids(index.search(10, "ownrship")) == [2]
+    assert ids(index.search(10, "decoraters")) == [1]
+    assert index.search(10, "ownrship", fuzzy=False) == []
+    assert index.search(10, "owxxrship") == []
+
+
+def test_results_are_scoped_to_owner(index):
+    assert ids(index.search(20, "python")) == [4]
+
+
+def test_update_and_remove(index):
+    index.add(2, 10, 100, fields("Rust lifetimes"))
+    assert index.search(10, "ownership") == []
+    assert ids(index.search(10, "lifetimes")) == [2]
+
+    index.remove(2)
+    assert index.search(10, "lifetimes") == []
+    index.remove_deck(100)
+    assert ids(index.search(10, "py")) == [3]
+    assert len(index) == 2
+
+
+def test_suggest_endpoint_follows_card_writes(
+    client, db_session, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(search_index.settings, "SEARCH_INDEX_ENABLED", True)
+    user = db_session.query(User).filter(User.email == "test@example.com").first()
+    deck = Deck(title="Deck", owner_id=user.id)
+    db_session.add(deck)
+    db_session.flush()
+    db_session.add(
+        Card(
+            deck_id=deck.id,
+            title="Existing closure card",
+            explanation="exp",
+            code_snippet="pass",
+            language="py",
+            tags=[],
+        )
+    )
+    db_session.commit()
+    assert search_index.rebuild(db_session) == 1
+
+    payload = {
+        "deck_id": deck.id,
+        "title": "Python decorators",
+        "code_snippet": "@wraps",
+        "explanation": "Wrap a function",
+        "language": "py",
+        "tags": ["lang:py"],
+    }
+    resp = client.post("/api/cards/", json=payload, headers=auth_headers)
+    card_id = resp.json()["id"]
+
+    def suggest(q):
+        resp = client.get(f"/api/cards/suggest?q={q}", headers=auth_headers)
+        assert resp.status_code == 200
+        return [hit["title"] for hit in resp.json()]
+
+    assert suggest("decorat") == ["Python decorators"]
+    assert suggest("closre") == ["Existing closure card"]
+
+    update = {"title": "Context managers"}
+    client.put(f"/api/cards/{card_id}", json=update, headers=auth_headers)
+    assert suggest("decorat") == []
+    assert suggest("context man") == ["Context managers"]
+
+    client.delete(f"/api/cards/{card_id}", headers=auth_headers)
+    assert suggest("context") == []
+
+    fork = client.post(f"/api/decks/{deck.id}/fork", headers=auth_headers).json()
+    assert suggest("closure") == ["Existing closure card"] * 2
+    client.delete(f"/api/decks/{fork['id']}", headers=auth_headers)
+    assert suggest("closure") == ["Existing closure card"]
+
+
+def test_suggest_falls_back_to_database_search(client, db_session, auth_headers):
+    user = db_session.query(User).filter(User.email == "test@example.com").first()
+    deck = Deck(title="Deck", owner_id=user.id)
+    db_session.add(deck)
+    db_session.flush()
+    db_session.add(
+        Card(
+            deck_id=deck.id,
+            title="Decorators",
+            explanation="exp",
+            code_snippet="pass",
+            language="py",
+            tags=[],
+        )
+    )
+    db_session.commit()
+
+    resp = client.get("/api/cards/suggest?q=decor", headers=auth_headers)
+    assert [hit["title"] for hit in resp.json()] == ["Decorators"]
+
+
+def test_prefix_cap_is_per_owner(index):
+    # Another user's many "deca..." tokens must not crowd out owner 10's matches
+    for i in range(300):
+        index.add(1000 + i, 30, 300, fields(f"deca{i:03d}"))
+    assert ids(index.search(10, "dec")) == [1, 3]
+    # The cap still bounds a single user's expansion
+    assert len(index.search(30, "dec", limit=500)) == search_index.MAX_PREFIX_EXPANSIONS
+
+    index.remove_deck(300)
+    assert index.search(30, "dec") == []
+    assert len(index) == 4
@@ -25,3 +25,28 @@ def test_sm2_forget():
     assert reps == 0
     assert interval == 1
     assert ease == 2.5
+
+
+def test_sm2_batch_matches_scalar():
+    from itertools import product
+    import numpy as np
+    from app.sm2 import calculate_sm2_batch
+
+    reference = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    cases = list(
+        product(range(6), [0, 1, 2, 7], [0, 1, 6, 15, 40], [1.3, 1.36, 2.5, 2.65])
+    )
+    q, reps, interval, ease = (np.array(col) for col in zip(*cases))
+
+    new_reps, new_interval, new_ease, next_review = calculate_sm2_batch(
+        q, reps, interval, ease, reference_time=reference
+    )
+
+    for i, case in enumerate(cases):
+        expected = calculate_sm2(*case, reviewed_at=reference)
+        assert new_reps[i] == expected[0]
+        assert new_interval[i] == expected[1]
+        assert new_ease[i] == expected[2]
+        assert next_review[i] == np.datetime64(
+            expected[3].replace(tzinfo=None), "us"
+        )
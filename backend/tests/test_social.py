@@ -1,4 +1,5 @@
 import pytest
+from datetime import timedelta
 from app.database import settings
 
 
@@ -111,3 +112,239 @@ def test_like_system(client):
             assert deck["likes_count"] == 0
             found = True
     assert found
+
+
+def test_marketplace_query_count_does_not_grow_with_decks(client, db_engine):
+    from sqlalchemy import event
+
+    header_a = get_auth_header(client, "user_a@example.com", "usera", "1")
+    header_b = get_auth_header(client, "user_b@example.com", "userb", "2")
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def marketplace_query_count():
+        statements.clear()
+        event.listen(db_engine, "before_cursor_execute", count_statement)
+        try:
+            resp = client.get("/api/decks/marketplace", headers=header_b)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", count_statement)
+        assert resp.status_code == 200
+        return len(statements)
+
+    deck_id = client.post(
+        "/api/decks/", headers=header_a, json={"title": "Deck 0", "is_public": True}
+    ).json()["id"]
+    client.post(f"/api/decks/{deck_id}/like", headers=header_b)
+    baseline = marketplace_query_count()
+
+    for i in range(1, 6):
+        deck_id = client.post(
+            "/api/decks/",
+            headers=header_a,
+            json={"title": f"Deck {i}", "is_public": True},
+        ).json()["id"]
+        client.post(f"/api/decks/{deck_id}/like", headers=header_b)
+        client.post(
+            f"/api/decks/{deck_id}/reviews", headers=header_b, json={"rating": 4}
+        )
+
+    assert marketplace_query_count() == baseline
+
+
+def test_deck_listings_are_summaries(client):
+    header = get_auth_header(client, "user_a@example.com", "usera", "1")
+    deck_id = client.post(
+        "/api/decks/", headers=header, json={"title": "Summary Deck", "is_public": True}
+    ).json()["id"]
+
+    for i, (language, tags) in enumerate(
+        [
+            ("python", ["lang:py", "concept:async"]),
+            ("python", ["lang:py"]),
+            ("sql", ["lang:sql", "concept:async"]),
+        ]
+    ):
+        client.post(
+            "/api/cards/",
+            headers=header,
+            json={
+                "deck_id": deck_id,
+                "title": f"Card {i}",
+                "code_snippet": "pass",
+                "explanation": "noop",
+                "language": language,
+                "tags": tags,
+            },
+        )
+
+    market_resp = client.get("/api/decks/marketplace", headers=header)
+    deck = next(d for d in market_resp.json() if d["id"] == deck_id)
+    assert "cards" not in deck
+    assert deck["card_count"] == 3
+    assert deck["languages"] == ["python", "sql"]
+    assert deck["top_tags"][:2] == ["concept:async", "lang:py"]
+
+    # Cards are fetched separately, one page at a time
+    page = client.get(f"/api/decks/{deck_id}/cards?limit=2", headers=header)
+    assert [c["title"] for c in page.json()] == ["Card 0", "Card 1"]
+
+
+def test_fork_copies_cards_in_bulk_and_resets_progress(client, db_session):
+    from app.models import Card
+
+    header_a = get_auth_header(client, "user_a@example.com", "usera", "1")
+    header_b = get_auth_header(client, "user_b@example.com", "userb", "2")
+    deck_id = client.post(
+        "/api/decks/", headers=header_a, json={"title": "Big", "is_public": True}
+    ).json()["id"]
+    db_session.add_all(
+        [
+            Card(
+                deck_id=deck_id,
+                title=f"Card {i}",
+                code_snippet="pass",
+                explanation="exp",
+                language="python",
+                tags=["lang:py"],
+                repetitions=3,
+                interval=10,
+                ease_factor=2.8,
+            )
+            for i in range(25)
+        ]
+    )
+    db_session.commit()
+
+    fork = client.post(f"/api/decks/{deck_id}/fork", headers=header_b).json()
+    assert fork["card_count"] == 25
+
+    cards = client.get(f"/api/decks/{fork['id']}/cards", headers=header_b).json()
+    assert [c["title"] for c in cards] == [f"Card {i}" for i in range(25)]
+    assert all(c["tags"] == ["lang:py"] for c in cards)
+    assert all(
+        (c["repetitions"], c["interval"], c["ease_factor"]) == (0, 0, 2.5)
+        for c in cards
+    )
+
+
+
+def test_marketplace_sorts_by_denormalized_counters(client, db_session):
+    from app.models import Deck
+
+    header_a = get_auth_header(client, "user_a@example.com", "usera", "1")
+    header_b = get_auth_header(client, "user_b@example.com", "userb", "2")
+    header_c = get_auth_header(client, "user_c@example.com", "userc", "3")
+
+    def create(title):
+        return client.post(
+            "/api/decks/", headers=header_a, json={"title": title, "is_public": True}
+        ).json()["id"]
+
+    def marketplace(query):
+        resp = client.get(f"/api/decks/marketplace?{query}", headers=header_b)
+        assert resp.status_code == 200
+        return resp
+
+    def titles(query):
+        return [deck["title"] for deck in marketplace(query).json()]
+
+    liked, forked, rated = create("Liked"), create("Forked"), create("Rated")
+    client.post(f"/api/decks/{liked}/like", headers=header_b)
+    client.post(f"/api/decks/{liked}/like", headers=header_c)
+    fork_id = client.post(f"/api/decks/{forked}/fork", headers=header_b).json()["id"]
+    client.post(f"/api/decks/{rated}/reviews", headers=header_b, json={"rating": 5})
+    client.post(f"/api/decks/{rated}/reviews", headers=header_c, json={"rating": 2})
+    # Updating a review replaces its rating in the sum
+    client.post(f"/api/decks/{rated}/reviews", headers=header_c, json={"rating": 4})
+
+    assert titles("sort=likes")[0] == "Liked"
+    assert titles("sort=forks")[0] == "Forked"
+    top_rated = marketplace("sort=rating").json()[0]
+    assert (top_rated["title"], top_rated["rating_avg"]) == ("Rated", 4.5)
+    assert top_rated["rating_count"] == 2
+    resp = client.get("/api/decks/marketplace?sort=oldest", headers=header_b)
+    assert resp.status_code == 422
+
+    # Keyset pagination follows the sort order
+    cursor = marketplace("sort=likes&limit=1").headers["X-Next-Cursor"]
+    rest = titles(f"sort=likes&cursor={cursor}")
+    assert ["Liked"] + rest == titles("sort=likes")
+
+    # Unliking withdraws exactly what the likes added to the trending score
+    client.post(f"/api/decks/{liked}/like", headers=header_b)
+    client.post(f"/api/decks/{liked}/like", headers=header_c)
+    deck = db_session.get(Deck, liked)
+    db_session.refresh(deck)
+    assert deck.likes_count == 0
+    assert titles("sort=trending")[-1] == "Liked"
+
+    # Deleting a fork withdraws its count and trending weight from the parent
+    client.delete(f"/api/decks/{fork_id}", headers=header_b)
+    deck = db_session.get(Deck, forked)
+    db_session.refresh(deck)
+    assert deck.forks_count == 0
+    assert deck.trending_score == 0.0
+
+
+
+def test_rebase_trending_moves_the_epoch_and_rescales_scores(client, db_session):
+    from app.models import Deck, User
+    from app.services import deck_service
+
+    get_auth_header(client, "user_a@example.com", "usera", "1")
+    user = db_session.query(User).filter_by(email="user_a@example.com").one()
+    hot = Deck(title="Hot", owner_id=user.id)
+    cold = Deck(title="Cold", owner_id=user.id)
+    db_session.add_all([hot, cold])
+    db_session.flush()
+
+    later = deck_service.TRENDING_EPOCH + 60 * deck_service.TRENDING_HALF_LIFE
+    epoch = deck_service.trending_epoch(db_session)
+    like = deck_service.trending_weight(deck_service.LIKE_WEIGHT, epoch, later)
+    deck_service.bump_counters(db_session, hot.id, likes=2, trending=2 * like)
+    deck_service.bump_counters(db_session, cold.id, likes=1, trending=like)
+    too_soon = deck_service.TRENDING_EPOCH + timedelta(weeks=51)
+    assert deck_service.rebase_trending(db_session, now=too_soon) == 0
+
+    assert deck_service.rebase_trending(db_session, now=later) == 60
+    assert deck_service.trending_epoch(db_session) == later
+    assert deck_service.rebase_trending(db_session, now=later) == 0
+    db_session.refresh(hot)
+    db_session.refresh(cold)
+    assert (hot.trending_score, cold.trending_score) == (2.0, 1.0)
+
+    # The like weighed against the new epoch is what the rescaled score holds;
+    # once no engagement is left the score is exactly 0
+    like = deck_service.trending_weight(
+        deck_service.LIKE_WEIGHT, deck_service.trending_epoch(db_session), later
+    )
+    assert like == 1.0
+    deck_service.bump_counters(db_session, cold.id, likes=-1, trending=-like * 0.9)
+    db_session.refresh(cold)
+    assert cold.trending_score == 0.0
+
+
+def test_like_toggle_returns_new_count(client):
+    header_a = get_auth_header(client, "user_a@example.com", "usera", "1")
+    header_b = get_auth_header(client, "user_b@example.com", "userb", "2")
+    deck_id = client.post(
+        "/api/decks/", headers=header_a, json={"title": "Toggle", "is_public": True}
+    ).json()["id"]
+
+    def toggle(header):
+        resp = client.post(f"/api/decks/{deck_id}/like", headers=header)
+        assert resp.status_code == 200
+        body = resp.json()
+        return body["liked"], body["likes_count"]
+
+    assert toggle(header_a) == (True, 1)
+    assert toggle(header_b) == (True, 2)
+    assert toggle(header_a) == (False, 1)
+    assert toggle(header_a) == (True, 2)
+
+    resp = client.post("/api/decks/999999/like", headers=header_a)
+    assert resp.status_code == 404
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+from app.models import Card, Deck, User
+
+
+def _make_card(deck_id, title, next_review):
+    return Card(
+        deck_id=deck_id,
+        title=title,
+        explanation="exp",
+        code_snippet="pass",
+        language="python",
+        tags=[],
+        next_review=next_review,
+    )
+
+
+def test_due_queue_orders_by_next_review(client, db_session, auth_headers):
+    user = db_session.query(User).filter(User.email == "test@example.com").first()
+    other = User(email="other@example.com", username="other")
+    db_session.add(other)
+    db_session.flush()
+
+    deck_a = Deck(title="A", owner_id=user.id)
+    deck_b = Deck(title="B", owner_id=user.id)
+    foreign = Deck(title="Foreign", owner_id=other.id, is_public=True)
+    db_session.add_all([deck_a, deck_b, foreign])
+    db_session.flush()
+
+    now = datetime.now(timezone.utc)
+    db_session.add_all(
+        [
+            _make_card(deck_a.id, "Due yesterday", now - timedelta(days=1)),
+            _make_card(deck_b.id, "Due last week", now - timedelta(days=7)),
+            _make_card(deck_a.id, "Due tomorrow", now + timedelta(days=1)),
+            _make_card(foreign.id, "Not mine", now - timedelta(days=30)),
+        ]
+    )
+    db_session.commit()
+
+    resp = client.get("/api/cards/due", headers=auth_headers)
+    assert resp.status_code == 200
+    assert [c["title"] for c in resp.json()] == ["Due last week", "Due yesterday"]
+
+    resp = client.get("/api/cards/due?limit=1", headers=auth_headers)
+    assert [c["title"] for c in resp.json()] == ["Due last week"]
+
+    resp = client.get(f"/api/cards/due?deck_id={deck_a.id}", headers=auth_headers)
+    assert [c["title"] for c in resp.json()] == ["Due yesterday"]
+
+
+def test_batch_review_applies_sm2_in_order(client, db_session, auth_headers):
+    user = db_session.query(User).filter(User.email == "test@example.com").first()
+    deck = Deck(title="Session", owner_id=user.id)
+    db_session.add(deck)
+    db_session.flush()
+    now = datetime.now(timezone.utc)
+    first = _make_card(deck.id, "First", now)
+    second = _make_card(deck.id, "Second", now)
+    db_session.add_all([first, second])
+    db_session.commit()
+
+    reviewed_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    resp = client.post(
+        "/api/cards/reviews/batch",
+        headers=auth_headers,
+        json={
+            "reviews": [
+                {
+                    "card_id": first.id,
+                    "rating": 5,
+                    "reviewed_at": (reviewed_at + timedelta(minutes=5)).isoformat(),
+                },
+                {
+                    "card_id": first.id,
+                    "rating": 4,
+                    "reviewed_at": reviewed_at.isoformat(),
+                },
+                {"card_id": second.id, "rating": 1},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    schedules = {s["id"]: s for s in resp.json()}
+
+    # Two successful reviews in a row: intervals 1 then 6 days
+    assert schedules[first.id]["repetitions"] == 2
+    assert schedules[first.id]["interval"] == 6
+    assert schedules[first.id]["ease_factor"] == 2.6
+    assert schedules[first.id]["next_review"].startswith("2026-01-07T00:05")
+    assert schedules[second.id]["repetitions"] == 0
+    assert schedules[second.id]["interval"] == 1
+
+    card = client.get(f"/api/cards/{first.id}", headers=auth_headers).json()
+    assert card["repetitions"] == 2
+    assert card["interval"] == 6
+
+
+def test_batch_review_rejects_foreign_cards(client, db_session, auth_headers):
+    other = User(email="other@example.com", username="other")
+    db_session.add(other)
+    db_session.flush()
+    deck = Deck(title="Foreign", owner_id=other.id, is_public=True)
+    db_session.add(deck)
+    db_session.flush()
+    card = _make_card(deck.id, "Not mine", datetime.now(timezone.utc))
+    db_session.add(card)
+    db_session.commit()
+
+    resp = client.post(
+        "/api/cards/reviews/batch",
+        headers=auth_headers,
+        json={"reviews": [{"card_id": card.id, "rating": 5}]},
+    )
+    assert resp.status_code == 404
+    db_session.refresh(card)
+    assert card.repetitions == 0
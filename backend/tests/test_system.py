@@ -0,0 +1,36 @@
+from app.database import Settings, engine_options, pool_capacity
+
+
+def test_engine_options_for_postgres():
+    settings = Settings(
+        DATABASE_URL="postgresql://u:p@db:5432/flash",
+        DB_POOL_SIZE=5,
+        DB_STATEMENT_TIMEOUT_MS=1500,
+        DB_IDLE_IN_TRANSACTION_TIMEOUT_MS=0,
+    )
+    options = engine_options(settings)
+    assert options["pool_size"] == 5
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=1500"}
+
+
+def test_engine_options_for_sqlite():
+    assert engine_options(Settings(DATABASE_URL="sqlite://")) == {}
+
+
+def test_default_threadpool_fits_the_pool():
+    settings = Settings(DATABASE_URL="postgresql://u:p@db:5432/flash")
+    assert pool_capacity(settings) == 30
+    assert settings.THREADPOOL_SIZE <= pool_capacity(settings)
+    assert pool_capacity(Settings(DATABASE_URL="sqlite://")) is None
+
+
+def test_db_pool_metrics_endpoint(client, auth_headers):
+    resp = client.get("/api/system/db-pool", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert {"checkouts_total", "checked_out", "peak_checked_out", "pool"} <= set(data)
+
+
+def test_db_pool_metrics_requires_auth(client):
+    assert client.get("/api/system/db-pool").status_code == 401
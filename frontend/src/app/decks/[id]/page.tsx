@@ -4,6 +4,7 @@ import { use, useState, useCallback } from "react";
 import {
   useDeck,
   useCards,
+  useDueCards,
   useUpdateDeck,
   useLikeDeck,
   useDeleteDeck,
@@ -63,6 +64,7 @@ export default function DeckPage({
 
   const { data: deck, isLoading: deckLoading } = useDeck(deckId);
   const { data: cards, isFetching: cardsFetching, isLoading: cardsLoading } = useCards(deckId, filters);
+  const { data: dueCards = [] } = useDueCards(deckId);
   const [isStudying, setIsStudying] = useState(false);
   const [layout, setLayout] = useState<1 | 2>(2);
   const [showDeleteDialog, setShowDeleteDialog] = useState(false);
@@ -123,8 +125,6 @@ export default function DeckPage({
       <div className="p-8 text-center text-destructive">Deck not found.</div>
     );
 
-  const dueCards =
-    cards?.filter((c: CardType) => new Date(c.next_review) <= new Date()) || [];
 
   if (isStudying) {
     return (
@@ -351,9 +351,9 @@ export default function ProfilePage() {
           </DialogHeader>
           
           <div className="py-4 px-2">
-            {decks?.find(d => d.id === deckToDelete)?.cards?.length && (decks.find(d => d.id === deckToDelete)!.cards!.length > 0) ? (
+            {(decks?.find(d => d.id === deckToDelete)?.card_count ?? 0) > 0 ? (
               <div className="bg-destructive/5 border border-destructive/20 rounded-lg p-3 text-xs text-destructive/80 font-mono text-center">
-                This will permanently eliminate {decks.find(d => d.id === deckToDelete)!.cards!.length} flashcard{decks.find(d => d.id === deckToDelete)!.cards!.length === 1 ? "" : "s"}.
+                This will permanently eliminate {decks!.find(d => d.id === deckToDelete)!.card_count} flashcard{decks!.find(d => d.id === deckToDelete)!.card_count === 1 ? "" : "s"}.
               </div>
             ) : null}
           </div>
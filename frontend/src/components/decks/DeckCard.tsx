@@ -86,7 +86,7 @@ export function DeckCard({ deck, href, showStats = false, showOwner = false, isO
             <div className="flex gap-4 items-center text-xs font-medium">
               <span className="flex items-center text-foreground">
                 <LayoutGrid className="mr-1.5 w-3 h-3 text-primary" />
-                {deck.cards?.length || 0} Cards
+                {deck.card_count} Cards
               </span>
             </div>
           </CardContent>
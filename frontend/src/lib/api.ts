@@ -34,6 +34,29 @@ client.interceptors.response.use(
   }
 );
 
+/**
+ * Follows the X-Next-Cursor header of a paginated list endpoint and
+ * concatenates every page.
+ */
+const fetchAllPages = async (url: string, params?: URLSearchParams | Record<string, unknown>) => {
+  const items: unknown[] = [];
+  let cursor: string | undefined;
+  do {
+    const pageParams = new URLSearchParams(
+      params instanceof URLSearchParams
+        ? params
+        : Object.entries(params ?? {})
+            .filter(([, value]) => value !== undefined && value !== null && value !== "")
+            .map(([key, value]) => [key, String(value)])
+    );
+    if (cursor) pageParams.set("cursor", cursor);
+    const response = await client.get(url, { params: pageParams });
+    items.push(...response.data);
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return items;
+};
+
 // ===================== Schemas =====================
 export const cardSchema = z.object({
   id: z.number(),
@@ -77,6 +100,9 @@ export const deckSchema = z.object({
   rating_avg: z.number().default(0),
   rating_count: z.number().default(0),
   parent_id: z.number().nullable().optional(),
+  card_count: z.number().default(0),
+  languages: z.array(z.string()).default([]),
+  top_tags: z.array(z.string()).default([]),
   cards: z.array(cardSchema).optional(),
 });
 
@@ -84,6 +110,9 @@ export const deckCreateSchema = deckSchema.omit({
   id: true,
   owner_id: true,
   cards: true,
+  card_count: true,
+  languages: true,
+  top_tags: true,
   likes_count: true,
   forks_count: true,
   rating_avg: true,
@@ -230,13 +259,11 @@ export const useDecks = (filters?: FilterState, options?: { enabled?: boolean })
   return useQuery<Deck[]>({
     queryKey: ["decks", filters],
     queryFn: async () => {
-      const response = await client.get("/decks", {
-        params: {
-          title__ilike: filters?.search,
-          ...filters,
-        },
+      const decks = await fetchAllPages("/decks", {
+        title__ilike: filters?.search,
+        ...filters,
       });
-      return z.array(deckSchema).parse(response.data);
+      return z.array(deckSchema).parse(decks);
     },
     staleTime: 30000,
     gcTime: 300000,
@@ -388,12 +415,13 @@ export const useCards = (deckId?: number, filters?: FilterState) => {
       const params = new URLSearchParams();
       if (filters?.search) params.append("search", filters.search);
       if (filters?.language) params.append("language", filters.language);
-      if (filters?.tags) {
-        filters.tags.forEach(tag => params.append("tags__contains", tag));
+      if (filters?.tags?.length) {
+        // Comma-separated; cards must carry every tag (`ns:*` matches a namespace)
+        params.append("tags__contains", filters.tags.join(","));
       }
 
-      const response = await client.get(url, { params });
-      return z.array(cardSchema).parse(response.data);
+      const cards = await fetchAllPages(url, params);
+      return z.array(cardSchema).parse(cards);
     },
     placeholderData: keepPreviousData,
     enabled: true,
@@ -401,6 +429,23 @@ export const useCards = (deckId?: number, filters?: FilterState) => {
   });
 };
 
+/**
+ * Fetches the study queue: cards whose review is due, most overdue first.
+ * Optionally restricted to one deck.
+ */
+export const useDueCards = (deckId?: number) => {
+  return useQuery<Card[]>({
+    queryKey: ["cards", deckId, "due"],
+    queryFn: async () => {
+      const response = await client.get("/cards/due", {
+        params: { limit: 200, ...(deckId ? { deck_id: deckId } : {}) },
+      });
+      return z.array(cardSchema).parse(response.data);
+    },
+    staleTime: 30000,
+  });
+};
+
 export const useCreateCard = () => {
   const queryClient = useQueryClient();
   return useMutation({